@@ -37,17 +37,20 @@ import math
 
 from objects import BayesAction, Action, Outcome, ReferenceClass, __empty__
 from context import outcome_records
+from records import encode, record_tree
 from player import BaseBallPlayer
 from game_exceptions import GameException, GameInjury, GameError
-from helpers import categorical_dist, build_subjects, cond_dampen
-
-choice = np.random.choice
+from helpers import categorical_dist, build_subjects, cond_dampen, \
+    as_stream, prior_sampler, label_mask, dampen_probs, modify_probs, \
+    renormalise
+from priors import CompiledPrior, compile_prior, compile_dict, register_prior
 
 def action_prior(**fields):
-    """Returns a prior distribution from paramaters, fields."""
-    prior = namedtuple('Prior', fields.keys())(**fields)
-    assert math.isclose(sum(prior), 1, rel_tol=.0001) 
-    return prior
+    """Returns a prior distribution from paramaters, fields.
+
+    The distribution is validated and compiled once (see priors.py).
+    """
+    return compile_prior(tuple(fields), tuple(fields.values())).prior
 
 class StartEvent(BayesAction):
     """Intial event, which can be used for debugging and deque
@@ -57,6 +60,8 @@ class StartEvent(BayesAction):
     ===========
     event_tag : str (default='<START>')
     """
+    __slots__ = ()
+
     def __init__(self, event_tag='<START>'):
         assert isinstance(event_tag, str)
         start_action = self._build_action_context(
@@ -74,11 +79,15 @@ class StartEvent(BayesAction):
         
 class _X_BayesAction(BayesAction):
     """Template for Event Classes during a Bayes Game"""
+    __slots__ = ('rng', '_probs', '_sampler')
+    prior = staticmethod(action_prior)
+
     def __init__(self, state=None, environment=None,
-                 action_name=__empty__, *subject_args):
+                 action_name=__empty__, *subject_args, rng=None):
         
-        self.probs = None
-        self.prior = action_prior
+        self.rng = as_stream(rng)
+        self._probs = None
+        self._sampler = None
         subjects = build_subjects(action_name, *subject_args)
         super().__init__(
             self._build_action_context(action_name, subjects),
@@ -94,15 +103,35 @@ class _X_BayesAction(BayesAction):
         is the same as calling the *random.choice* function from NumPy:
 
         > random.choice(['A', 'B'], p=[.3, .7])
+
+        The draw uses the cached alias table of the prior (see
+        helpers.prior_sampler), instead of rebuilding the distribution.
+        probs can also be a priors.CompiledPrior.
         """
-        if isinstance(probs, dict):
-            prob_dict = probs
+        if probs is None:
+            sampler = self._sampler
+            if sampler is None:
+                sampler = prior_sampler(self._probs)
+        elif isinstance(probs, CompiledPrior):
+            sampler = probs.sampler
         else:
-            probs = self.probs if probs == None else probs
-            prob_dict = probs._asdict()
-        outcomes = list(prob_dict.keys())
-        probs_values = list(prob_dict.values())
-        return np.random.choice(outcomes, p=probs_values)
+            sampler = prior_sampler(probs)
+        return sampler.draw(self.rng.random())
+
+    @property
+    def probs(self):
+        """Returns the Prior namedtuple of the event outcomes."""
+        return self._probs
+
+    @probs.setter
+    def probs(self, probs):
+        self._probs = probs
+        self._sampler = None
+
+    def set_prior(self, compiled):
+        """Sets the event outcome priors to a priors.CompiledPrior."""
+        self._probs = compiled.prior
+        self._sampler = compiled.sampler
     
 class CatchEvent(_X_BayesAction):
     """CatchEvent
@@ -113,8 +142,12 @@ class CatchEvent(_X_BayesAction):
     - Miss (player unable to catch a ball)
     - Drop (can cause an error)
     """
-    def __init__(self, state, environment, *subject_args):
-        super().__init__(state, environment, 'catch', *subject_args)
+    __slots__ = ()
+    priors = dict(yes=.6, miss=.3, drop=.1)
+    compiled_priors = register_prior('catch', priors)
+
+    def __init__(self, state, environment, *subject_args, rng=None):
+        super().__init__(state, environment, 'catch', *subject_args, rng=rng)
 
     def random_triggers(self):
         """Not Implemented"""
@@ -128,14 +161,15 @@ class CatchEvent(_X_BayesAction):
         - drop (Catch attempt is made, but dropped)
         (If you edit, make sure to change context.py)
         """
-        self.probs = self.prior(yes=.6, miss=.3, drop=.1)
+        self.set_prior(self.compiled_priors)
                 
     def _perform_action(self):
         self._happened = True
         outcome = self.choice()
         fielder = self.action.subjects.player
-        record = outcome_records['catch'][outcome]
-        complete_record = record.format(fielder.pos)
+        complete_record = encode(
+            record_tree['catch'][outcome], fielder.pos, actor=fielder.num
+        )
         details = dict(fielder=fielder)
         self['outcome'] = Outcome(outcome, complete_record, details)
             
@@ -151,26 +185,32 @@ class ThrowEvent(_X_BayesAction):
 
     (At the moment, these outcomes do not have any negative consequences!)
     """
-    def __init__(self, state, environment, *subject_args):
-        super().__init__(state, environment, 'throw', *subject_args)
+    __slots__ = ()
+    priors = dict(good=.7, dirt=.1, low=.1, high=.1)
+    compiled_priors = register_prior('throw', priors)
+
+    def __init__(self, state, environment, *subject_args, rng=None):
+        super().__init__(state, environment, 'throw', *subject_args, rng=rng)
         
     def upkeep(self):
         """Assigns prior probailities directly to Throw event outcomes.
         (see context.py for more information on what these outcomes are.)
         """
-        self.probs = self.prior(good=.7, dirt=.1, low=.1, high=.1)
+        self.set_prior(self.compiled_priors)
 
     def random_triggers(self):
         """Not implemented"""
         return NotImplemented
         
     def _perform_action(self):
-        self._happend = True
+        self._happened = True
         outcome = self.choice()
         fielder = self.action.subjects.player
         target = self.action.subjects.target
-        record = outcome_records['throw'][outcome]
-        complete_record = record.format(fielder.pos, target.pos)
+        complete_record = encode(
+            record_tree['throw'][outcome], fielder.pos, target.pos,
+            actor=fielder.num
+        )
         details = dict(player=fielder, target=target)
         self['outcome'] = Outcome(outcome, complete_record, details)
         
@@ -179,8 +219,10 @@ class MoveEvent(_X_BayesAction):
     base, or a caught stolen base, is handled from above, depending
     on whether a tagged event occurs! This means: no choice function
     should be used, at least for now."""
-    def __init__(self, state, environment, *subject_args):
-        super().__init__(state, environment, 'move', *subject_args)
+    __slots__ = ()
+
+    def __init__(self, state, environment, *subject_args, rng=None):
+        super().__init__(state, environment, 'move', *subject_args, rng=rng)
     def upkeep(self): pass
     def random_triggers(self): pass
 
@@ -190,8 +232,9 @@ class MoveEvent(_X_BayesAction):
         to_base = self.action.subjects.to_base
         from_base = self.action.subjects.from_base
         player = self.action.subjects.player
-        record = outcome_records['move'][outcome]
-        complete_record = record.format(from_base, to_base)
+        complete_record = encode(
+            record_tree['move'][outcome], from_base, to_base, actor=player.num
+        )
         details = dict(from_base=from_base, to_base=to_base, player=player)
         self['outcome'] = Outcome(outcome, complete_record, details)
         
@@ -205,11 +248,15 @@ class TagEvent(_X_BayesAction):
     - safe
     - out
     """
-    def __init__(self, state=None, environment=None, *subject_args):
-        super().__init__(state, environment, 'tag', *subject_args)
+    __slots__ = ()
+    priors = dict(safe=.8, out=.2)
+    compiled_priors = register_prior('tag', priors)
+
+    def __init__(self, state=None, environment=None, *subject_args, rng=None):
+        super().__init__(state, environment, 'tag', *subject_args, rng=rng)
         
     def upkeep(self):
-        self.probs = self.prior(safe=.8, out=.2)
+        self.set_prior(self.compiled_priors)
 
     def random_triggers(self): pass
         
@@ -219,14 +266,18 @@ class TagEvent(_X_BayesAction):
         outcome = self.choice()
         tagger = self.action.subjects.tagger
         tagged = self.action.subjects.tagged
-        record = outcome_records['tag'][outcome]
-        complete_record = record.format(tagger.num, tagged.num)
+        complete_record = encode(
+            record_tree['tag'][outcome], tagger.num, tagged.num,
+            actor=tagged.num
+        )
         details = dict(tagger=tagger, tagged=tagged)
         self['outcome'] = Outcome(outcome, complete_record, details)
 
 class ShiftEvent(_X_BayesAction):   
-    def __init__(self, state, environment, *subject_args):
-        super().__init__(state, environment, 'shift', *subject_args)
+    __slots__ = ()
+
+    def __init__(self, state, environment, *subject_args, rng=None):
+        super().__init__(state, environment, 'shift', *subject_args, rng=rng)
 
     def upkeep(self): pass
 
@@ -236,18 +287,25 @@ class ShiftEvent(_X_BayesAction):
         details = {}
         playerstack = self.action.subjects.playerstack
         varstack = self.action.subjects.varstack
-        record = outcome_records['shift'][shift_option]
+        record = record_tree['shift'][shift_option]
         assert all(isinstance(v, list) for v in [playerstack, varstack])
         if shift_option in ['sub', 'swap']:
-            complete_record = record.format(
-                playerstack[0], playerstack[1]
+            complete_record = encode(
+                record, playerstack[0].num, playerstack[1].num
             )
             details['new_player'] = playerstack[0]
             details['old_player'] = playerstack[1]
-        elif shift_option in ['ASCORE', 'HSCORE', 'out', 'iwalk']:
-            complete_record = record
+        elif shift_option in ['ASCORE', 'HSCORE']:
+            """The actor of a run is the runner who scored (if given)"""
+            num = playerstack[0].num if playerstack else 0
+            complete_record = encode(record, actor=num)
+            if playerstack:
+                details['runner'] = playerstack[0]
+        elif shift_option in ['out', 'iwalk']:
+            complete_record = encode(record)
         elif shift_option in ['lead']:
-            complete_record = record.format(playerstack[0])
+            num = playerstack[0].num
+            complete_record = encode(record, num, actor=num)
             details['leadoff'] = playerstack[0]
         else:
             raise NotImplemented
@@ -287,10 +345,42 @@ class PitchEvent(_X_BayesAction):
 
         condition below.
     """
-    def __init__(self, state, environment, *subject_args):
+    __slots__ = ('possible_outcomes', '_hit', 'player_choices',
+                 '_batter_done')
+
+    """Pitch outcome priors, before the batter decides to swing"""
+    priors = dict(wild=.03, balk=.01, hbp=.01,
+                  strike=.3, ball=.3, contact=.35)
+    """Outcomes ruled out (dampened) when the batter swings / holds"""
+    swing_dampened = ('balk', 'ball', 'wild')
+    hold_dampened = ('balk', 'contact')
+    """Size of the batter/pitcher modifiers for each guess"""
+    modifier_unit = .1
+
+    """Priors for the type of contact, and then for each contact type"""
+    contact_priors = dict(hit=.4, foul=.45, oop=.1, bunt=.05)
+    hit_priors = dict(single=.5, double=.35, triple=.149, four=.001)
+    oop_priors = dict(gdb=.05, hr=.95)
+
+    compiled_priors = register_prior('pitch', priors)
+    compiled_contact = register_prior('pitch.contact', contact_priors)
+    """Priors of the record type, for each type of result"""
+    compiled_results = dict(
+        bunt=register_prior('pitch.contact.bunt', dict(bunt=1)),
+        oop=register_prior('pitch.contact.oop', oop_priors),
+        foul=register_prior('pitch.contact.foul', dict(foul=1)),
+        hit=register_prior('pitch.contact.hit', hit_priors),
+        wild=register_prior('pitch.wild', dict(wp=1)),
+        balk=register_prior('pitch.balk', dict(blk=1)),
+        hbp=register_prior('pitch.hbp', dict(hbp=1))
+    )
+    """Outcome priors, by (class, swung, batter_mod, pitcher_mod)"""
+    _outcome_cache = {}
+
+    def __init__(self, state, environment, *subject_args, rng=None):
         self.possible_outcomes = None
         self._hit = False
-        super().__init__(state, environment, 'pitch', *subject_args)
+        super().__init__(state, environment, 'pitch', *subject_args, rng=rng)
         
     @property
     def hit(self): return self._hit
@@ -298,26 +388,83 @@ class PitchEvent(_X_BayesAction):
     def random_triggers(self): pass
 
     def upkeep(self):
-        self.probs = self.prior(wild=.03, balk=.01, hbp=.01,
-                                strike=.3, ball=.3, contact=.35)
-        
+        self.set_prior(self.compiled_priors)
+
+    @classmethod
+    def outcome_priors(cls, swung, batter_mod, pitcher_mod):
+        """Returns the pitch outcome priors, once the batter has
+        decided whether to swing, and the batter/pitcher modifiers
+        are known.
+
+        Paramaters:
+        ==========
+        swung : Boolean
+        batter_mod : float (added to contact)
+        pitcher_mod : float (added to strike, and ball if not swung)
+        """
+        return cls.compiled_outcome_priors(swung, batter_mod, pitcher_mod).prior
+
+    @classmethod
+    def compiled_outcome_priors(cls, swung, batter_mod, pitcher_mod):
+        """Returns PitchEvent.outcome_priors as a (cached) CompiledPrior."""
+        key = (cls, swung, batter_mod, pitcher_mod)
+        compiled = cls._outcome_cache.get(key)
+        if compiled is None:
+            row = cls.outcome_matrix([swung], [batter_mod], [pitcher_mod])[0]
+            compiled = compile_prior(
+                cls.compiled_priors.labels, tuple(row.tolist())
+            )
+            cls._outcome_cache[key] = compiled
+        return compiled
+
+    @classmethod
+    def outcome_matrix(cls, swung, batter_mod, pitcher_mod):
+        """Batched PitchEvent.outcome_priors, for many pitches at once.
+
+        Paramaters:
+        ==========
+        swung : boolean array (n,)
+        batter_mod : float array (n,)
+        pitcher_mod : float array (n,)
+
+        Returns an array (n, 6) of outcome probabilities, with columns
+        in the order of PitchEvent.compiled_priors.labels.
+        """
+        labels = cls.compiled_priors.labels
+        swung = np.asarray(swung, dtype=bool)[:, None]
+        batter_mod = np.asarray(batter_mod, dtype=float)[:, None]
+        pitcher_mod = np.asarray(pitcher_mod, dtype=float)[:, None]
+        base = np.array(cls.compiled_priors.probs)
+        probs = np.where(
+            swung,
+            dampen_probs(base, label_mask(labels, cls.swing_dampened)),
+            dampen_probs(base, label_mask(labels, cls.hold_dampened))
+        )
+        strike = label_mask(labels, ('strike',))
+        ball = label_mask(labels, ('ball',))
+        contact = label_mask(labels, ('contact',))
+        probs = modify_probs(
+            probs, strike * pitcher_mod + contact * batter_mod
+                   + (ball & ~swung) * pitcher_mod
+        )
+        probs = np.where(ball & swung, 0., probs)
+        return renormalise(probs)
+
     def _perform_action(self):
         self._happened = True
-        batter = self.get('action').subjects.batter
-        pitcher = self.get('action').subjects.pitcher
-        batter_guess = pitcher.make_decision('pitch') 
-        pitcher_decision = pitcher.make_decision('pitch')
-
-        batter.make_decision('swing')
-        if batter.swung:
-            probs = self.probs._asdict()
-            batter_decision = batter.make_decision('hit')
-            temp_dict = cond_dampen(probs, ('balk','ball', 'wild'))
-            self.probs = self.prior(**temp_dict)
+        batter = self.action.subjects.batter
+        pitcher = self.action.subjects.pitcher
+        pitch_types = pitcher.pitch_types
+        batter_guess = pitcher.make_decision('pitch', pitch_types,
+                                             rng=self.rng)
+        pitcher_decision = pitcher.make_decision('pitch', pitch_types,
+                                                 rng=self.rng)
+
+        batter.make_decision('swing', rng=self.rng)
+        swung = batter.swung
+        if swung:
+            batter_decision = batter.make_decision('hit', rng=self.rng)
         else:
-            probs = self.probs._asdict()
-            temp_dict = cond_dampen(probs, ('balk', 'contact'))
-            self.probs = self.prior(**temp_dict)
             """Batter doesn't swing'"""
             batter_decision = 'hold'
             
@@ -329,7 +476,7 @@ class PitchEvent(_X_BayesAction):
         working on a module for simulating just that, but it isn't
         being used here, mainly for simplicity sake.
         """
-        unit = .1
+        unit = self.modifier_unit
         batter_mod = 0
         pitcher_mod = 0
         """Checks if batter guessed pitcher's decision'"""
@@ -347,19 +494,9 @@ class PitchEvent(_X_BayesAction):
                 batter_mod+=unit
             else: pitcher_mod+=unit
 
-        new_ball = 0.0 if batter.swung else self.probs.ball+pitcher_mod
-
-        n = sum((self.probs.wild, self.probs.balk, self.probs.hbp,
-                 self.probs.strike+pitcher_mod,
-                 new_ball,
-                 self.probs.contact+batter_mod))
-        self.probs = self.prior(
-            wild=self.probs.wild/n,
-            balk=self.probs.balk/n,
-            hbp=self.probs.hbp/n,
-            strike=(self.probs.strike+pitcher_mod)/n,
-            ball=new_ball/n,
-            contact=(self.probs.contact+batter_mod)/n)
+        self.set_prior(self.compiled_outcome_priors(
+            swung, batter_mod, pitcher_mod
+        ))
             
         
         """For later use:
@@ -380,35 +517,21 @@ class PitchEvent(_X_BayesAction):
         outs = gs.count.outs
         runners_on = sum(gs.bases)
         locs = self.ref_class.environment.locations
-        prior = self.prior
+        pick = self.rng.pick
 
         """priors"""
-        hit_type_priors = prior(hit=.4, foul=.45,
-                                oop=.1, bunt=.05)
-
-        wild_priors = prior(wp=1)
-        balk_priors = prior(blk=1)
-        hbp_priors = prior(hbp=1)
-        hit_foul_priors = prior(foul=1)
-        hit_bunt_priors = prior(bunt=1)
-        hit_oop_priors = prior(gdb=.05, hr=.95)
-        hit_ball_priors = prior(
-            single=.5, double=.35, triple=.149, four=.001
-        )
-
-        base_prior_map = dict(
-            bunt=hit_bunt_priors, oop=hit_oop_priors,
-            foul=hit_foul_priors, hit=hit_ball_priors,
-            wild=wild_priors, balk=balk_priors,
-            hbp=hbp_priors
-        )
+        hit_type_priors = self.compiled_contact
+        base_prior_map = self.compiled_results
+        wild_priors = base_prior_map['wild']
+        balk_priors = base_prior_map['balk']
+        hbp_priors = base_prior_map['hbp']
 
         record_type = self.choice()
-        precs = outcome_records['pitch']  # pitch records mappings
+        precs = record_tree['pitch']  # pitch record types
         record = None
         
         if record_type == 'strike':
-            if batter.swung:
+            if swung:
                 if strikes >= 2:
                     record = precs['strikeout']['swing']
                     record_type = 'strikeout'
@@ -435,24 +558,24 @@ class PitchEvent(_X_BayesAction):
             record_type = self.choice(base_prior_map[contact_type])
             record = precs['contact'][contact_type][record_type]
             """quick hack to get fielder"""
-            if record in precs['contact']['foul'].values():
+            if contact_type == 'foul':
                 if pitcher_decision[0] == 'fastball' \
                    and batter_decision[0] == 'power':
-                    fielder = choice([locs.center, locs.left, locs.right])
+                    fielder = pick((locs.center, locs.left, locs.right))
                 elif batter_decision[0] == 'contact':
-                    fielder = choice([locs.first, locs.gap, locs.third])
+                    fielder = pick((locs.first, locs.gap, locs.third))
                 else:
                     fielder = locs.home
                 
-            elif record in precs['contact']['bunt'].values():
-                fielder = choice([locs.home, locs.mound, locs.third])
-            elif record in precs['contact']['hit'].values():
+            elif contact_type == 'bunt':
+                fielder = pick((locs.home, locs.mound, locs.third))
+            elif contact_type == 'hit':
                 if batter_decision[0] == 'power':
-                    fielder = choice((locs.left, locs.center, locs.right))
+                    fielder = pick((locs.left, locs.center, locs.right))
                 else:
-                    fielder = choice((locs.third, locs.gap,
+                    fielder = pick((locs.third, locs.gap,
                                       locs.second, locs.first))
-            elif record in precs['contact']['oop'].values():
+            elif contact_type == 'oop':
                 fielder = None
             else:
                 raise NotImplementedError
@@ -484,6 +607,7 @@ class PitchEvent(_X_BayesAction):
             raise NotImplementedError
 
         details = dict(ball=None, fielder=fielder)
+        record = encode(record, actor=batter.num)
         self['outcome'] = Outcome(record_type, record, details)
 
     def build_outcome_from_hit_result(
@@ -25,34 +25,13 @@ along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
 import curses
 from itertools import count
 from game import BaseBallGame
-from helpers import match, match_array
-from context import outcome_records
-from copy import deepcopy
-
-def flatten(d, label):
-    assert isinstance(d, dict)
-    catch = []
-    for k, v in d.items():
-        if isinstance(v, dict):
-            v = deepcopy(v)
-            if label:
-                catch.extend(flatten(v, label))
-            else:
-                catch.extend(flatten(v, k))
-        else:
-            catch.append((label, v))
-    return catch
-
-
-event_map = flatten(outcome_records, None)
+from records import record_label
 
 def get_rec_label(rec):
-    global event_map
-    rec_name = 'missing'
-    for label, rec_type in event_map:
-        if match(rec, rec_type):
-            rec_name = label
-    return rec_name
+    """Returns the label of a record, e.g. 'pitch' or 'move' (see
+    records.record_label).
+    """
+    return record_label(rec)
 
 def app(c, home_p, main_p, away_p):
     """Simple curses-based application to watch a BayesBall simulation.
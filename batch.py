@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+from collections import namedtuple
+import numpy as np
+
+from markov import N_STATES, event_model, index_state, \
+    pitch_transitions, state_index
+
+"""Batched game engine.
+
+Plays many games in lockstep: the state of every game is a few NumPy
+arrays, and each step draws one pitch (or pick-off attempt) for all the
+games still in play, from the transition tables of the half-inning
+chain (see markov.py), which are read off the same priors PitchEvent
+and the players use.
+
+By default the tables follow BaseBallGame's counting (see
+markov.pitch_transitions, engine=True), and the runners left on base
+at the end of a half inning stay on base, as the fielding Locations of
+BaseBallGame do, so the batched games have the distributions of the
+object-based engine.  With engine=False, they follow the exact chain.
+
+Chain states are numbered as in markov.py; next states N_STATES + m
+are the end of the half inning, with the runners m left on base.
+"""
+
+BatchResult = namedtuple('BatchResult', [
+    'away', 'home', 'half_runs', 'halves', 'pitches', 'decided'
+])
+
+class TransitionSampler(object):
+    """Sampling tables of the half-inning chain.
+
+    Paramaters:
+    ==========
+    model : ChainModel (default: markov.event_model())
+    engine : Boolean (default: True)
+
+    Attributes:
+    ==========
+    cdf : array (N_STATES, width), cumulative transition probabilities
+    next_state : array (N_STATES, width)
+    runs : array (N_STATES, width)
+    """
+    def __init__(self, model=None, engine=True):
+        self.model = event_model() if model is None else model
+        self.engine = engine
+        rows = []
+        for i in range(N_STATES):
+            """Transitions to the same state, with the same runs, are merged."""
+            merged = {}
+            for p, b, s, o, m, runs in pitch_transitions(
+                    *index_state(i), self.model, engine=engine):
+                if o >= 3:
+                    j = N_STATES + m
+                else:
+                    j = state_index(b, s, o, m)
+                merged[j, runs] = merged.get((j, runs), 0.) + p
+            rows.append(sorted(merged.items(), key=lambda kv: -kv[1]))
+        width = max(len(row) for row in rows)
+        self.cdf = np.ones((N_STATES, width))
+        self.next_state = np.zeros((N_STATES, width), dtype=np.int32)
+        self.runs = np.zeros((N_STATES, width), dtype=np.int32)
+        for i, row in enumerate(rows):
+            n = len(row)
+            states, runs = zip(*[key for key, _ in row])
+            probs = np.array([p for _, p in row])
+            self.cdf[i, :n] = np.cumsum(probs) / probs.sum()
+            self.cdf[i, n - 1:] = 1.
+            self.next_state[i, :n] = states
+            self.next_state[i, n:] = states[-1]
+            self.runs[i, :n] = runs
+            self.runs[i, n:] = runs[-1]
+
+    def step(self, states, u):
+        """Draws the next states of the chain states, by the uniform
+        numbers u (arrays of the same shape).
+
+        Returns (next_states, runs)
+        """
+        cdf = self.cdf[states]
+        k = (cdf < u[:, None]).sum(axis=1)
+        return self.next_state[states, k], self.runs[states, k]
+
+def simulate_games(n, seed=None, sampler=None, max_innings=30):
+    """Plays n games in lockstep.
+
+    Paramaters:
+    ==========
+    n : int
+    seed : int, SeedSequence or Generator (default: None)
+    sampler : TransitionSampler (default: TransitionSampler())
+    max_innings : int (default: 30)
+
+    - games still tied after max_innings are stopped, undecided.
+
+    Returns a BatchResult of arrays (n,): the final away and home
+    scores, the number of half innings and pitches played, whether
+    the game was decided, and half_runs, an array (n, 2*max_innings)
+    of the runs scored in each half inning.
+    """
+    sampler = TransitionSampler() if sampler is None else sampler
+    rng = np.random.default_rng(seed)
+    max_halves = 2 * max_innings
+    state = np.zeros(n, dtype=np.int32)
+    half = np.zeros(n, dtype=np.int32)
+    away = np.zeros(n, dtype=np.int32)
+    home = np.zeros(n, dtype=np.int32)
+    pitches = np.zeros(n, dtype=np.int64)
+    half_runs = np.zeros((n, max_halves), dtype=np.int16)
+    live = np.arange(n)
+    while live.size:
+        nxt, runs = sampler.step(state[live], rng.random(live.size))
+        h = half[live]
+        top = h % 2 == 0
+        away[live] += np.where(top, runs, 0)
+        home[live] += np.where(top, 0, runs)
+        half_runs[live, h] += runs
+        pitches[live] += 1
+        state[live] = nxt
+        ended = nxt >= N_STATES
+        if not ended.any():
+            continue
+        games = live[ended]
+        carried = nxt[ended] - N_STATES if sampler.engine else 0
+        half[games] += 1
+        """Game over rules of BaseBallGame.win, at the new half inning"""
+        I = 1 + .5 * half[games]
+        diff = home[games] - away[games]
+        over = ((I >= 9) & (diff > 0)) | ((I >= 9.5) & (diff < 0)) \
+               | (half[games] >= max_halves)
+        state[games] = state_index(0, 0, 0, carried)
+        live = np.concatenate((live[~ended], games[~over]))
+    return BatchResult(
+        away=away, home=home, half_runs=half_runs, halves=half,
+        pitches=pitches, decided=home != away
+    )
+
+"""Validation"""
+def half_inning_runs(result):
+    """Returns the runs of every half inning played, as a flat array."""
+    played = np.arange(result.half_runs.shape[1]) < result.halves[:, None]
+    return result.half_runs[played]
+
+def _histogram(runs, max_runs):
+    """Run frequencies, the last bin is max_runs or more."""
+    return np.bincount(np.minimum(runs, max_runs),
+                       minlength=max_runs + 1) / len(runs)
+
+def compare_runs(sample, reference, max_runs=10):
+    """Mean, z score of the difference of means, and total variation
+    distance of two samples of half inning runs.
+    """
+    se = np.sqrt(sample.var() / len(sample) + reference.var() / len(reference))
+    return dict(
+        mean=float(sample.mean()),
+        reference_mean=float(reference.mean()),
+        z=float((sample.mean() - reference.mean()) / se),
+        tv=float(.5 * np.abs(_histogram(sample, max_runs)
+                             - _histogram(reference, max_runs)).sum())
+    )
+
+def validate(games=5000, object_games=200, seed=0, max_runs=10):
+    """Checks the batched engine against the engines it reproduces.
+
+    Paramaters:
+    ==========
+    games : int (default: 5000), batched games played
+    object_games : int (default: 200), BaseBallGame games played
+    seed : int (default: 0)
+    max_runs : int (default: 10), runs histograms are cut at max_runs
+
+    Returns a dict with:
+
+    - 'engine': batched games (engine=True) against simulate_game,
+      per half inning runs and the home win fraction.
+    - 'chain': batched games (engine=False) against the exact half
+      inning run distribution of markov.HalfInningChain.
+
+    z scores are of the difference of the mean runs (|z| < 3 is a
+    match), and tv is the total variation distance of the histograms.
+    """
+    from game import simulate_game
+    from helpers import spawn_seeds
+    from markov import HalfInningChain
+
+    batch_seed, chain_seed = np.random.SeedSequence(seed).spawn(2)
+    result = simulate_games(games, seed=batch_seed)
+    batch_runs = half_inning_runs(result)
+    object_runs = []
+    object_home_wins = 0
+    for s in spawn_seeds(seed, object_games):
+        game = simulate_game(seed=s)
+        object_runs.extend(game.line_score.away)
+        object_runs.extend(game.line_score.home)
+        score = game.gamestate.score
+        object_home_wins += score.home > score.away
+    engine = compare_runs(batch_runs, np.array(object_runs), max_runs)
+    engine.update(
+        home_win=float((result.home > result.away).mean()),
+        reference_home_win=object_home_wins / object_games
+    )
+
+    chain = HalfInningChain()
+    exact = chain.half_inning_distribution(max_runs=max_runs)
+    chain_runs = half_inning_runs(simulate_games(
+        games, seed=chain_seed, sampler=TransitionSampler(engine=False)
+    ))
+    full = chain.half_inning_distribution(max_runs=200)
+    mean = full @ np.arange(201)
+    var = full @ np.arange(201) ** 2 - mean ** 2
+    exact_check = dict(
+        mean=float(chain_runs.mean()),
+        reference_mean=float(mean),
+        z=float((chain_runs.mean() - mean) / np.sqrt(var / len(chain_runs))),
+        tv=float(.5 * np.abs(_histogram(chain_runs, max_runs) - exact).sum())
+    )
+    return dict(engine=engine, chain=exact_check)
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+    pprint(validate())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from itertools import count
+from statistics import median
+
+import numpy as np
+
+from batch import simulate_games, TransitionSampler
+from actions import PitchEvent, CatchEvent, ThrowEvent, TagEvent, \
+    MoveEvent, ShiftEvent
+from game import BaseBallGame, Environment, simulate_game
+from helpers import namedtuple_factory_calls
+from season import simulate_season
+
+"""Benchmark suite.
+
+Run with:
+
+    python3 bench.py [--output bench.json]
+
+Every benchmark uses fixed seeds, so two runs (or two versions of the
+code) do the same work, and the JSON report can be diffed.  Timings are
+in microseconds (events, pitches) or seconds (games); the best of
+--repeat runs is reported, as timeit does.
+"""
+
+def _best_time(fn, number, repeat):
+    """Returns the best, over repeat runs, of the mean time (seconds)
+    of number calls of fn.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def _started_game(seed):
+    """Returns a game at the first pitch of the first inning."""
+    game = BaseBallGame(None, None, rng=seed)
+    game.upkeep(1)
+    game.change_lineup
+    return game
+
+def bench_events(number=2000, repeat=5, seed=0):
+    """Per event cost (microseconds) of building and performing each
+    actions.py event class, outside of the game loop.
+    """
+    game = _started_game(seed)
+    gs = game.gamestate
+    rng = game.rng
+    locs = game.locations.snapshot()
+    batter = game.batter
+    pitcher = game.pitcher
+    env = Environment(weather=None, locations=locs, importance=0,
+                      batter=batter, pitcher=pitcher)
+    cases = dict(
+        PitchEvent=lambda: PitchEvent(
+            gs, env, None, pitcher, batter, rng=rng).make_happen,
+        CatchEvent=lambda: CatchEvent(
+            gs, env, None, locs.home, rng=rng).make_happen,
+        ThrowEvent=lambda: ThrowEvent(
+            gs, env, None, locs.home, locs.second, rng=rng).make_happen,
+        TagEvent=lambda: TagEvent(
+            gs, env, None, locs.second, batter, rng=rng).make_happen,
+        MoveEvent=lambda: MoveEvent(
+            gs, env, batter, 0, 1, rng=rng).make_happen('move'),
+        ShiftEvent=lambda: ShiftEvent(
+            gs, env, [], [], rng=rng).make_happen('out')
+    )
+    return dict((name, 1e6 * _best_time(fn, number, repeat))
+                for name, fn in cases.items())
+
+def bench_pitches(pitches=5000, seed=0):
+    """Per pitch cost (microseconds) of BaseBallGame.play, in the game
+    loop.  New games are started (from consecutive seeds) as needed.
+    """
+    elapsed = 0.
+    played = 0
+    seed = int(seed)
+    while played < pitches:
+        game = BaseBallGame(None, None, rng=seed)
+        seed += 1
+        for I in count(1, .5):
+            game.upkeep(I)
+            if game.win(I) or played >= pitches:
+                break
+            while game.gamestate.count.outs < 3 and played < pitches:
+                start = time.perf_counter()
+                game.play
+                elapsed += time.perf_counter() - start
+                played += 1
+    return dict(pitches=played, per_pitch_us=1e6 * elapsed / played)
+
+def bench_games(games=20, seed=0):
+    """Wall time (seconds) of full games, played by simulate_game."""
+    times = []
+    events = []
+    for n in range(games):
+        start = time.perf_counter()
+        result = simulate_game(seed=seed + n)
+        times.append(time.perf_counter() - start)
+        events.append(len(result.events))
+    return dict(
+        games=games,
+        best_s=min(times),
+        median_s=median(times),
+        mean_s=sum(times) / games,
+        events_per_game=sum(events) / games,
+        per_event_us=1e6 * sum(times) / sum(events)
+    )
+
+def bench_processes(games=40, processes=None, seed=0):
+    """Games per second of simulate_season for each process count."""
+    if processes is None:
+        processes = list(range(1, (os.cpu_count() or 1) + 1))
+    rates = {}
+    for p in processes:
+        start = time.perf_counter()
+        simulate_season(games, seed=seed, processes=p)
+        rates[str(p)] = games / (time.perf_counter() - start)
+    return rates
+
+def bench_batch(games=20000, seed=0):
+    """Games per second of the batched engine (batch.simulate_games),
+    without the time to build its transition tables.
+    """
+    sampler = TransitionSampler()
+    start = time.perf_counter()
+    simulate_games(games, seed=seed, sampler=sampler)
+    return dict(games=games,
+                games_per_second=games / (time.perf_counter() - start))
+
+def bench_memory(seed=0):
+    """Peak memory of a full game: the peak of Python allocations
+    (tracemalloc) and the peak resident set size of the process.
+    """
+    tracemalloc.start()
+    simulate_game(seed=seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory = dict(game_peak_alloc_kb=peak / 1024.)
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        """ru_maxrss is in bytes on macOS, and in kilobytes elsewhere"""
+        if sys.platform == 'darwin':
+            rss /= 1024.
+        memory['max_rss_kb'] = rss
+    except ImportError:
+        pass
+    return memory
+
+def bench_namedtuples(seed=0):
+    """Namedtuple classes created during a full game (after a warm up
+    game, which fills the lazily built caches).  Should be empty.
+    """
+    simulate_game(seed=seed)
+    before = namedtuple_factory_calls.copy()
+    simulate_game(seed=seed + 1)
+    return dict(namedtuple_factory_calls - before)
+
+"""Modules that must not be imported by importing the game engine"""
+lazy_modules = ('scipy',)
+
+"""Default import time budget of the game engine (ms)"""
+import_budget_ms = 500.
+
+def bench_import(module='game', budget_ms=None):
+    """Import time of a module in a fresh interpreter, from
+    python -X importtime.
+
+    Returns a dict with the cumulative import time (ms), the slowest
+    imports, the lazy_modules that were imported (should be none) and,
+    given a budget_ms, whether the import is within it.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=cwd, capture_output=True, text=True, timeout=120
+    )
+    if out.returncode:
+        raise RuntimeError(out.stderr)
+    cumulative = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total_us)
+    total_ms = cumulative[module] / 1000.
+    slowest = sorted(cumulative.items(), key=lambda kv: -kv[1])[1:6]
+    report = dict(
+        module=module,
+        total_ms=total_ms,
+        slowest_ms=dict((name, us / 1000.) for name, us in slowest),
+        lazy_imported=sorted(set(
+            name.split('.')[0] for name in cumulative
+            if name.split('.')[0] in lazy_modules
+        ))
+    )
+    if budget_ms is not None:
+        report['budget_ms'] = budget_ms
+        report['within_budget'] = (total_ms <= budget_ms
+                                   and not report['lazy_imported'])
+    return report
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def run_benchmarks(events=2000, pitches=5000, games=20,
+                   season_games=40, processes=None, repeat=5, seed=0,
+                   batch_games=20000, import_budget_ms=import_budget_ms):
+    """Runs the benchmark suite, and returns the report as a dict."""
+    report = dict(
+        meta=dict(
+            commit=_git_commit(),
+            python=platform.python_version(),
+            numpy=np.__version__,
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            seed=seed
+        )
+    )
+    report['import'] = bench_import('game', import_budget_ms)
+    report['memory'] = bench_memory(seed)
+    report['namedtuple_classes_per_game'] = bench_namedtuples(seed)
+    report['events_us'] = bench_events(events, repeat, seed)
+    report['pitch'] = bench_pitches(pitches, seed)
+    report['game'] = bench_games(games, seed)
+    report['games_per_second'] = bench_processes(season_games, processes, seed)
+    report['batch'] = bench_batch(batch_games, seed)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BayesBall benchmarks')
+    parser.add_argument('--events', type=int, default=2000,
+                        help='calls per event class (default: 2000)')
+    parser.add_argument('--pitches', type=int, default=5000,
+                        help='pitches timed in the game loop (default: 5000)')
+    parser.add_argument('--games', type=int, default=20,
+                        help='full games timed (default: 20)')
+    parser.add_argument('--season-games', type=int, default=40,
+                        help='games per process count (default: 40)')
+    parser.add_argument('--processes', type=str, default=None,
+                        help='comma separated process counts '
+                             '(default: 1 to the number of CPUs)')
+    parser.add_argument('--batch-games', type=int, default=20000,
+                        help='games played by the batched engine '
+                             '(default: 20000)')
+    parser.add_argument('--import-budget-ms', type=float,
+                        default=import_budget_ms,
+                        help='fail (exit status 1) if importing game takes '
+                             'longer, or imports SciPy (default: {:g})'
+                             .format(import_budget_ms))
+    parser.add_argument('--import-only', action='store_true',
+                        help='only run the import time check')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None,
+                        help='JSON file for the report (default: stdout)')
+    args = parser.parse_args(argv)
+    processes = None
+    if args.processes:
+        processes = [int(p) for p in args.processes.split(',')]
+    if args.import_only:
+        report = {
+            'meta': dict(commit=_git_commit(),
+                         python=platform.python_version()),
+            'import': bench_import('game', args.import_budget_ms)
+        }
+    else:
+        report = run_benchmarks(
+            args.events, args.pitches, args.games, args.season_games,
+            processes, args.repeat, args.seed, args.batch_games,
+            args.import_budget_ms
+        )
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if not report['import'].get('within_budget', True):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -157,7 +157,17 @@ outcome_records = dict(
         ASCORE='<AwayScore>',
         out='<Out>'
     )
-) 
+)
+
+"""Records written by a BaseBallGame which are not action outcomes"""
+game_records = dict(
+    start='<START>',
+    pitchout='pitchout:{}',  # pick-off attempt: fielder
+    error='E:{}',  # error: fielder
+    dp='DP:{}-{}',  # double play: first fielder, last fielder
+    tp='TP:{}-{}-{}',  # triple play: first, second, last fielder
+    pa='PA:{}-{}'  # plate appearance (fast mode): bases after, runs
+)
         
 
 
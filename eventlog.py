@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import os
+from glob import glob
+import numpy as np
+
+from logic import packed_dtype, packed_to_array
+from records import code_dtype
+
+"""Columnar event logs.
+
+An event log is a directory with one subdirectory per column, holding
+the column in numbered .npy segments:
+
+    log/code/000000.npy, log/code/000001.npy, ...
+
+Every record applied to a game's gamestate is a row:
+
+    game    : game id
+    seq     : position of the record in its game, in the order the
+              records were applied (BaseBallGame.apply_records)
+    time    : record time
+    code    : event code (see records.py)
+    actor   : number of the acting player (the event code's actor)
+    batter  : number of the batter
+    pitcher : number of the pitcher
+    pre     : packed gamestate before the record (see logic.py)
+    post    : packed gamestate after the record
+
+The writer buffers one segment of rows and writes it when it is full,
+so memory stays bounded however many games are logged.  The reader
+memory maps the segments back.
+"""
+
+event_columns = (
+    ('game', np.uint32),
+    ('seq', np.uint32),
+    ('time', np.float64),
+    ('code', code_dtype),
+    ('actor', np.uint8),
+    ('batter', np.uint8),
+    ('pitcher', np.uint8),
+    ('pre', packed_dtype),
+    ('post', packed_dtype)
+)
+column_names = tuple(name for name, _ in event_columns)
+
+def _segment_path(path, column, n):
+    return os.path.join(path, column, '{:06d}.npy'.format(n))
+
+class EventLogWriter(object):
+    """Streams event records into a columnar event log.
+
+    Paramaters:
+    ==========
+    path : str, the log directory (created if needed)
+    chunk_size : int (default: 65536), rows per segment
+
+    A writer is the event sink of games (see
+    BaseBallGame.set_event_sink): the game calls write for every
+    record it applies.  Use it as a context manager, or call close, to
+    write the last, partial, segment.
+    """
+    def __init__(self, path, chunk_size=1 << 16):
+        assert chunk_size > 0
+        self.path = path
+        self.chunk_size = chunk_size
+        for name in column_names:
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+        self.segments = len(glob(os.path.join(path, 'code', '*.npy')))
+        self.rows = 0
+        self._buffers = [np.empty(chunk_size, dtype)
+                         for _, dtype in event_columns]
+        self._n = 0
+
+    def write(self, game, seq, time, code, actor, batter, pitcher, pre, post):
+        """Adds a row to the log."""
+        n = self._n
+        for buffer, value in zip(self._buffers, (game, seq, time, code, actor,
+                                                 batter, pitcher, pre, post)):
+            buffer[n] = value
+        self._n = n + 1
+        self.rows += 1
+        if self._n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows as a new segment."""
+        if not self._n:
+            return
+        for name, buffer in zip(column_names, self._buffers):
+            np.save(_segment_path(self.path, name, self.segments),
+                    buffer[:self._n])
+        self.segments += 1
+        self._n = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class EventSinks(object):
+    """Forwards the records of a game to several event sinks, e.g. an
+    EventLogWriter and a stats.StatsBook.
+    """
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def start_game(self, game_id, away, home):
+        for sink in self.sinks:
+            start_game = getattr(sink, 'start_game', None)
+            if start_game is not None:
+                start_game(game_id, away, home)
+
+    def write(self, *row):
+        for sink in self.sinks:
+            sink.write(*row)
+
+class EventLog(object):
+    """Reads a columnar event log.
+
+    Paramaters:
+    ==========
+    path : str, the log directory
+
+    Columns are memory mapped, segment by segment: log.segments(name)
+    returns the segments of a column, log[name] the whole column (read
+    into memory), and log.chunks() iterates over the segments of every
+    column together.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._files = dict(
+            (name, sorted(glob(os.path.join(path, name, '*.npy'))))
+            for name in column_names
+        )
+        lengths = set(len(files) for files in self._files.values())
+        if len(lengths) != 1:
+            raise ValueError('Incomplete event log {}'.format(path))
+
+    def segments(self, name):
+        """Returns the memory mapped segments of a column."""
+        return [np.load(f, mmap_mode='r') for f in self._files[name]]
+
+    def __getitem__(self, name):
+        segments = self.segments(name)
+        if not segments:
+            return np.empty(0, dict(event_columns)[name])
+        return np.concatenate(segments)
+
+    def __len__(self):
+        return sum(len(s) for s in self.segments('code'))
+
+    def chunks(self, names=column_names):
+        """Yields dicts {column name: memory mapped segment}."""
+        files = [self._files[name] for name in names]
+        for segment in zip(*files):
+            yield dict((name, np.load(f, mmap_mode='r'))
+                       for name, f in zip(names, segment))
+
+    def states(self, name='post'):
+        """Returns the pre or post gamestates as a structured array
+        (see logic.packed_to_array).
+        """
+        return packed_to_array(self[name])
@@ -33,22 +33,34 @@ from math import modf
 import numpy as np
 
 """BayesBall modules"""
-from logic import GameState
+from logic import GameState, apply_packed
 from objects import BayesAction, Outcome
 from context import outcome_records
+from records import EventCode, as_code, encode, record_tree, record_types, \
+    hit_bases
 from actions import StartEvent, ThrowEvent, PitchEvent, CatchEvent, \
-    TagEvent, MoveEvent, choice, ShiftEvent
+    TagEvent, MoveEvent, ShiftEvent
 from game_exceptions import GameInjury, GameException, GameError
-from player import BaseBallPlayer, Positions, pos_from_str
+from player import BaseBallPlayer, PlayerTable, Positions, pos_from_str
 from helpers import categorical_dist, populate_random_roster, \
-    gappy_to_probs, match, match_array
+    gappy_to_probs, match, match_array, as_stream
+from winprob import win_probability
+from markov import plate_appearance_distribution, state_index
 
 records = outcome_records
+codes = record_tree
 
 Environment = namedtuple('Environment',
                          ['weather', 'importance',
                           'locations', 'batter', 'pitcher'])
 GameRecord = namedtuple('GameRecord', ['time', 'outcome'])
+GameResult = namedtuple('GameResult', ['gamestate', 'line_score', 'events'])
+GameSnapshot = namedtuple('GameSnapshot', [
+    'gamestate', 'time', 'win_msg', 'batter_done',
+    'away_pos', 'home_pos', 'away_next', 'home_next',
+    'batter', 'pitcher', 'locations', 'players', 'rng_state'
+])
+LineScore = namedtuple('LineScore', ['away', 'home'])
 Team = namedtuple('Team', ['name', 'lineup', 'roster'])
 location_names = ('home', 'homeplate', 'mound',
                   'secondbase', 'thirdbase', 'firstbase',
@@ -58,9 +70,163 @@ location_names = ('home', 'homeplate', 'mound',
 Locations = namedtuple('Locations', location_names)
 NullLocations = Locations(*[None]*len(location_names))
 
+class FieldLocations(object):
+    """The players at each location of the field (or None), updated in
+    place as runners move and fielders change.
+
+    version counts the changes.  snapshot() returns the immutable
+    Locations namedtuple of the field, which is only rebuilt after a
+    location has changed.  A version is pinned (see pin) into a
+    history dict when an event refers to it: on the next change, its
+    snapshot is saved in the history.  Histories belong to the pinners
+    (see PlayEnvironment), so they go away with them.
+    """
+    __slots__ = location_names + ('version', '_snapshot', '_pinned')
+
+    def __init__(self, *players, **kwargs):
+        players = players or [None] * len(location_names)
+        assert len(players) == len(location_names)
+        for name, player in zip(location_names, players):
+            object.__setattr__(self, name, player)
+        object.__setattr__(self, 'version', 0)
+        object.__setattr__(self, '_snapshot', None)
+        object.__setattr__(self, '_pinned', [])
+        self.update(**kwargs)
+
+    def __setattr__(self, name, player):
+        if self._pinned:
+            snapshot = self.snapshot()
+            for history in self._pinned:
+                history[self.version] = snapshot
+            self._pinned.clear()
+        object.__setattr__(self, name, player)
+        object.__setattr__(self, 'version', self.version + 1)
+        object.__setattr__(self, '_snapshot', None)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in location_names)
+
+    def update(self, **players):
+        """Sets the players at the named locations."""
+        for name, player in players.items():
+            if getattr(self, name) is not player:
+                setattr(self, name, player)
+
+    def pin(self, history):
+        """Saves the snapshot of the current version in the dict
+        history before the next change, and returns the version.
+        """
+        pinned = self._pinned
+        if not pinned or pinned[-1] is not history:
+            pinned.append(history)
+        return self.version
+
+    def snapshot(self):
+        """Returns the (cached) Locations namedtuple of the field."""
+        if self._snapshot is None:
+            object.__setattr__(self, '_snapshot', Locations(*self))
+        return self._snapshot
+
+    def _asdict(self):
+        return self.snapshot()._asdict()
+
+    def __getstate__(self):
+        return tuple(self)
+
+    def __setstate__(self, players):
+        self.__init__(*players)
+
+    def __repr__(self):
+        return repr(self.snapshot()).replace('Locations', 'FieldLocations', 1)
+
+class PlayEnvironment(object):
+    """The environment of the events of a plate appearance.
+
+    It is built once per plate appearance (i.e. for each batter and
+    pitcher), and its locations are the live FieldLocations of the
+    game, so events hold a reference to it, instead of an Environment
+    namedtuple each.  version is the version of the locations: an
+    event pins the version it is created at and keeps it in its
+    ReferenceClass, and capture(version) returns the immutable
+    Environment namedtuple the event saw.  Locations are only copied
+    (into history) when they change after an event pinned them, and
+    the copies live as long as the environment and its events.
+    """
+    __slots__ = ('weather', 'importance', 'locations', 'batter', 'pitcher',
+                 'history')
+
+    def __init__(self, locations, batter, pitcher, weather=None,
+                 importance=0):
+        self.weather = weather
+        self.importance = importance
+        self.locations = locations
+        self.batter = batter
+        self.pitcher = pitcher
+        self.history = {}
+
+    @property
+    def version(self):
+        return self.locations.version
+
+    def pin(self):
+        """Pins and returns the current version (see FieldLocations.pin)."""
+        return self.locations.pin(self.history)
+
+    def capture(self, version=None):
+        """Returns the Environment namedtuple of a pinned version
+        (default: the current version).
+        """
+        locations = self.locations
+        if version is None or version == locations.version:
+            snapshot = locations.snapshot()
+        else:
+            snapshot = self.history[version]
+        return Environment(
+            weather=self.weather, locations=snapshot,
+            importance=self.importance, batter=self.batter,
+            pitcher=self.pitcher
+        )
+
+    def __repr__(self):
+        return 'PlayEnvironment(batter={}, pitcher={}, version={})'.format(
+            self.batter, self.pitcher, self.version
+        )
+
+"""Fielding location of each position"""
+position_locations = {'C': 'home', '1B': 'first', '2B': 'second',
+                      '3B': 'third', 'SS': 'gap', 'LF': 'left',
+                      'CF': 'center', 'RF': 'right', 'P': 'mound'}
+pitcher_pos = pos_from_str('P')
+
+"""Record types used to find double/triple plays"""
+fly_out_type = codes['pitch']['outs']['fo']
+other_out_types = frozenset([
+    codes['pitch']['outs']['lo'], codes['pitch']['outs']['go']
+])
+score_types = frozenset([codes['shift']['ASCORE'], codes['shift']['HSCORE']])
+"""Outs made at home plate: strikeouts, and, as in the record strings,
+where both were 'PB', passed balls.  Tag outs are not counted."""
+home_out_types = record_types('pitch.strikeout') | frozenset([
+    codes['pitch']['wild']['pb']
+])
+
 """Currently not implemented"""
 BaseBall = namedtuple('BaseBall',['velocity', 'angle', 'z_spin', 'y_spin'])
 
+"""Plate appearance sampling table of the fast mode, built on first use"""
+_pa_cdf = None
+
+def plate_appearance_cdf():
+    """Returns the cumulative distributions of plate appearance results
+    (see markov.plate_appearance_distribution), one row per chain state,
+    over the flattened (outs, bases, runs) results.
+    """
+    global _pa_cdf
+    if _pa_cdf is None:
+        dist = plate_appearance_distribution()
+        _pa_cdf = np.cumsum(dist.reshape(len(dist), -1), axis=1)
+    return _pa_cdf
+
 class _BayesGame(deque):
     """Base Game Class Template.
 
@@ -73,8 +239,9 @@ class _BayesGame(deque):
 
 class BayesGame(_BayesGame):
     """Base Game Class"""
-    def __init__(self, away_team, home_team, time=0):
+    def __init__(self, away_team, home_team, time=0, rng=None):
         super().__init__(GameRecord(time, StartEvent().result))
+        self.rng = as_stream(rng)
 
         """For pre-alpha dev use only!
 
@@ -82,7 +249,8 @@ class BayesGame(_BayesGame):
         """
         if away_team == None or home_team == None:
             home_team, away_team = populate_random_roster(
-                25, BaseBallPlayer, Positions, Team
+                25, BaseBallPlayer, Positions, Team, rng=self.rng,
+                table=PlayerTable(50)
             )
             
         self._away = away_team
@@ -94,11 +262,11 @@ class BayesGame(_BayesGame):
     def add_record(self, rec, time=None, debug=False):
         """Add a record to BayesGame instance (a deque)
 
-        rec : str
+        rec : EventCode (or a record str, which is converted to one)
         time : Number (default: None) [Currently not Implemented]
         debug : Boolean (default: False)
         """
-        assert isinstance(rec, str)
+        rec = as_code(rec)
         time = self.current_time if time == None else time
         if debug:
             print('Adding {} to deque'.format(rec))
@@ -147,12 +315,22 @@ class BayesGame(_BayesGame):
 
 
 class BaseBallGame(BayesGame):
-    """Main Class to Play a *Complete* Baseball Game"""
-    def __init__(self, away_team, home_team, debug=False):
-        super().__init__(away_team, home_team)
+    """Main Class to Play a *Complete* Baseball Game
+
+    With fast=True, every play is a whole plate appearance, sampled
+    without event objects (see BaseBallGame.play_plate_appearance).
+    """
+    def __init__(self, away_team, home_team, debug=False, rng=None,
+                 fast=False):
+        super().__init__(away_team, home_team, rng=rng)
+        self.fast = fast
+        self.event_sink = None
+        self.game_id = 0
+        self._seq = 0
         self.batter = None
         self.pitcher = None
-        self.locations = NullLocations
+        self.locations = FieldLocations()
+        self.environment = None
         self.home_next_bat = cycle(range(0, 9))
         self.away_next_bat = cycle(range(0, 9))
         self._home_pos = 0
@@ -160,35 +338,39 @@ class BaseBallGame(BayesGame):
         self._batter_done = True
         self.debug = debug
         self.debug_msgs = []
+        self.position_index = {}
+        self.fielding = {}
         self.initial_upkeep()
         
 
     def initial_upkeep(self):
         """Populates team lineups."""
-        def place_players(linup):
-            """Helper function to place players on the field depending
-            on their position. 
+        self.index_positions('away')
+        self.index_positions('home')
+        self.place_fielders()
+
+    def index_positions(self, side):
+        """Indexes the lineup of a team ('away' or 'home') by position:
+        position_index[side] maps positions to players, and
+        fielding[side] maps fielding locations to players.  Called when
+        the lineup changes (see sub_players and swap_players).
+        """
+        index = dict((p.pos, p) for p in getattr(self, side).lineup)
+        self.position_index[side] = index
+        self.fielding[side] = dict(
+            (loc, index.get(pos_from_str(pos_name)))
+            for pos_name, loc in position_locations.items()
+            if pos_from_str(pos_name) in index
+        )
 
-            Paramaters:
-            ==========
-            linup: list
+    def fielder(self, side, pos_name):
+        """Returns the player of a team at a position (or None)."""
+        return self.position_index[side].get(pos_from_str(pos_name))
 
-            - linup shoudl be a list of BaseBallPlayer instances
-            """
-            pos_to_loc = {'C': 'home', '1B': 'first', '2B': 'second',
-                          '3B': 'third', 'SS': 'gap', 'LF': 'left',
-                          'CF': 'center', 'RF': 'right', 'P': 'mound'}
-            locs = self.locations._asdict()
-            for p in linup:
-                for pos_name in pos_to_loc.keys():
-                    if p.pos == pos_from_str(pos_name):
-                        locs[pos_to_loc.get(pos_name)] = p
-            self.locations = Locations(**locs)
-
-        if self.gamestate.inning.order == 'top':
-            place_players(self.home.lineup)
-        else:
-            place_players(self.away.lineup)
+    def place_fielders(self):
+        """Places the fielding team on the field, keeping the runners."""
+        side = 'home' if self.gamestate.inning.order == 'top' else 'away'
+        self.locations.update(**self.fielding[side])
             
     @property
     def batter_finished(self):
@@ -213,15 +395,17 @@ class BaseBallGame(BayesGame):
         old_pos = old.pos
         team = getattr(self, side)
         old_lineup = team.lineup
-        new_roster = getattr(team, side+'_bench')
-        old_index = old_lineup.index(old)
-        new_index = new_roster.index(new)
-        old.pos('Bench')
+        new_roster = team.roster
+        old_index = list(old_lineup).index(old)
+        new_index = list(new_roster).index(new)
+        old.pos = 'Bench'
         new._pos = old_pos
         name = team.name
         new_roster[new_index] = old
         old_lineup[old_index] = new
         self.__setattr__('_'+side, Team(name, old_lineup, new_roster))
+        self.index_positions(side)
+        self.place_fielders()
         
     def swap_players(self, old, new):
         """(Experimental.) This function swaps the Player *old*
@@ -234,7 +418,40 @@ class BaseBallGame(BayesGame):
         pos_new = new.pos
         old._pos = pos_new
         new._pos = pos_old
-        self.initial_upkeep()
+        self.index_positions(
+            'away' if old in self.away.lineup else 'home'
+        )
+        self.place_fielders()
+
+    def result(self):
+        """Returns the result of a finished game.
+
+        Returns:
+         1, if the home team won.
+         0, if the away team won.
+        -1, if the game is not (yet) decided.
+        """
+        scores = self.gamestate.score
+        if self.win_msg is None or scores.home == scores.away:
+            return -1
+        return 1 if scores.home > scores.away else 0
+
+    def win_probability(self, table=None):
+        """Returns the chance that the home team wins from the current
+        gamestate, looked up in a precomputed win table (see winprob.py).
+        """
+        if self.win_msg is not None:
+            return float(self.result() == 1)
+        return win_probability(self.gamestate, table, self.runners_mask())
+
+    def runners_mask(self):
+        """Returns the occupied base mask (first=1, second=2, third=4)
+        of the runners on the field, which stay on base after the
+        third out.
+        """
+        locs = self.locations
+        return (bool(locs.firstbase) | bool(locs.secondbase) << 1
+                | bool(locs.thirdbase) << 2)
 
     def win(self, I):
         """Returns True if the current game is over, False otherwise. """
@@ -415,15 +632,14 @@ class BaseBallGame(BayesGame):
                         self.action_move(runner, n, m, option='steal')
 
         """Action instantiation."""
-        action = action_cls(
-            self.gamestate,
-            Environment(
-                weather=None, locations=self.locations,
-                importance=0, batter=self.batter,
-                pitcher=self.pitcher
-            ),
-            *subjects
-        )
+        env = self.environment
+        if env is None or env.batter is not self.batter \
+                or env.pitcher is not self.pitcher \
+                or env.locations is not self.locations:
+            env = self.environment = PlayEnvironment(
+                self.locations, self.batter, self.pitcher
+            )
+        action = action_cls(self.gamestate, env, *subjects, rng=self.rng)
         
         if action.has_name('PitchEvent'):
             pitch = action            
@@ -432,11 +648,11 @@ class BaseBallGame(BayesGame):
             for n in basenames:
                 if getattr(self.locations, n):
                     player = getattr(self.locations, n)
-                    player.make_decision('leadoff')
-                    player.make_decision('steal')
+                    player.make_decision('leadoff', rng=self.rng)
+                    player.make_decision('steal', rng=self.rng)
                     bases.append((n, player))
-            self.pitcher.make_decision('pick-off', bases)
-            if self.pitcher.pick_off:
+            self.pitcher.make_decision('pick-off', bases, rng=self.rng)
+            if bases and self.pitcher.pick_off:
                 """If there is a pitch-out, after the throw/catch/tag
                 sequence is over, the play ends and a new pitch event
                 has to start.
@@ -446,7 +662,9 @@ class BaseBallGame(BayesGame):
                 fielder = getattr(self.locations, base)
                 runner = getattr(self.locations, loc)
                 throw_arc(self.pitcher, fielder, runner)
-                record = 'pitchout:{}'.format(fielder.pos)
+                record = encode(
+                    codes['game']['pitchout'], fielder.pos, actor=fielder.num
+                )
                 pitch['outcome'] = Outcome('pitch_out', record, {})
                 return pitch
                 
@@ -521,9 +739,11 @@ class BaseBallGame(BayesGame):
                     runners can still run! ... so sacflys,
                     etc. are not possible at the moment!!!
                     """
-                    rec_dict = records['pitch']['outs']
-                    record = choice(list(rec_dict.values()))
-                    self.add_record(record.format(fielder.pos))
+                    rec_dict = codes['pitch']['outs']
+                    record = self.rng.pick(list(rec_dict.values()))
+                    self.add_record(
+                        encode(record, fielder.pos, actor=fielder.num)
+                    )
                     self.action_shift('out')
                     self._batter_done = True
                 else:
@@ -536,7 +756,7 @@ class BaseBallGame(BayesGame):
                     ALSO: runners should be able to attempt
                     to keep running!
                     """
-                    N = int(hit.record.split(':')[1])
+                    N = hit_bases[hit.result]
                     play_hit(N)
                     self._batter_done = True
                     self.add_record(hit.record)
@@ -567,8 +787,10 @@ class BaseBallGame(BayesGame):
                 ball = hit.outcome.details['ball']
                 catch = self.action_catch(ball, fielder)
                 if catch.result == 'yes':
-                    record = records['pitch']['outs']['go']
-                    self.add_record(record.format(fielder.pos))
+                    record = codes['pitch']['outs']['go']
+                    self.add_record(
+                        encode(record, fielder.pos, actor=fielder.num)
+                    )
                     self.action_shift('out')
                     self._batter_done = True
                 else:
@@ -581,8 +803,10 @@ class BaseBallGame(BayesGame):
                 ball = hit.outcome.details['ball']
                 catch = self.action_catch(ball, fielder)
                 if catch.result == 'yes':
-                    record = records['pitch']['outs']['fo']
-                    self.add_record(record.format(fielder.pos))
+                    record = codes['pitch']['outs']['fo']
+                    self.add_record(
+                        encode(record, fielder.pos, actor=fielder.num)
+                    )
                     self.action_shift('out')
                     self._batter_done = True
                 else:
@@ -606,34 +830,30 @@ class BaseBallGame(BayesGame):
             initial_runners = sum(self.gamestate.bases)
             FLYO = -1
             SCORE = False
-            GIDP = False
             out_events = []
             triple_possible = (initial_outs < 1) \
                               and (initial_runners > 1)
             double_possible = (initial_outs < 2) \
                               and (initial_runners > 0)
             for x, grec in enumerate(self):
-                splitrec = grec.outcome.split(':')
-                if splitrec[0] == 'FO':
+                rec = grec.outcome
+                if not isinstance(rec, EventCode):
+                    continue
+                rtype = rec.rtype
+                if rtype == fly_out_type:
                     FLYO = x
-                    out_events.append((grec.time, grec.outcome.split(':')[1]))
-                elif grec.outcome in ['ASCORE', 'HSCORE']:
+                    out_events.append((grec.time, rec.a))
+                elif rtype in score_types:
                     SCORE = True
-                elif grec.outcome in ['PB', 'Ks', 'Kc', 'FT']:
+                elif rtype in home_out_types:
                     out_events.append((grec.time, self.locations.home.pos))
-                elif len(splitrec) > 1 and splitrec[1] == 'out':
-                    firstplayernum = splitrec[0].split('<')[1]
-                    secondplayernum = splitrec[2].split('>')[0]
-                    out_events.append(
-                        (grec.time, firstplayernum, secondplayernum)
-                    )
-                elif splitrec[0] in ['LO', 'FC', 'GO']:
-                    out_events.append((grec.time, splitrec[1]))
-                    if splitrec[0] == 'FC':
-                        GDIP = True
+                elif rtype in other_out_types:
+                    out_events.append((grec.time, rec.a))
 
             if (FLYO > -1) and SCORE:
-                self.add_record('SF', self[FLYO].time)
+                self.add_record(
+                    encode(codes['pitch']['sack']['sacf']), self[FLYO].time
+                )
 
             """In baseball, triple/double plays are recorded like:
 
@@ -641,46 +861,24 @@ class BaseBallGame(BayesGame):
             between positions 3 and 5, but player 6 did NOT make
             an out.
 
-            Below, I just record the players who make outs.
+            Below, I just record the players who make outs: the
+            first and last for a double play, and all three for a
+            triple play.
 
             Good enough for now ... BUT STILL BROKEN
             """
             if triple_possible and len(out_events) == 3:
                 out_events.sort()
-                playernums = []
-                max_time = 0
-                for t, p in out_events:
-                    playernums.extend(p)
-                    max_time = max(t, max_time)
-                num = len(playernums)
-                assert num > 0 and 5 > num
-                records = {
-                    1: 'TP:{}',
-                    2: 'TP:{}-{}',
-                    3: 'TP:{}-{}-{}',
-                    4: 'TP:{}-{}-{}-{}'
-                }
-                rec = records[num]
-                self.add_record(rec.format(*playernums), max_time)
+                max_time = out_events[-1][0]
+                rec = encode(codes['game']['tp'], out_events[0][1],
+                             out_events[1][1], out_events[2][1])
+                self.add_record(rec, max_time)
             if double_possible and len(out_events) == 2:
                 out_events.sort()
-                playernums = []
-                max_time = 0
-                for t, p in out_events:
-                    playernums.extend(p)
-                    max_time = max(t, max_time)
-                num = len(playernums)
-                assert num > 0 and 4 > num
-                records = {
-                    1: 'DP:{}',
-                    2: 'DP:{}-{}',
-                    3: 'DP:{}-{}-{}'
-                }
-                rec = records[num]
-                self.add_record(rec.format(*playernums), max_time)
-
-                if GIDP:
-                    self.add_record(rec.format('GIDP'), max_time)
+                max_time = out_events[-1][0]
+                rec = encode(codes['game']['dp'],
+                             out_events[0][1], out_events[-1][1])
+                self.add_record(rec, max_time)
 
             return pitch
             
@@ -707,7 +905,7 @@ class BaseBallGame(BayesGame):
                 """
 
                 # fresh copy of locations!
-                locs = self.locations
+                locs = self.locations.snapshot()
                 """Update where the runners are heading next
                 right now: they automatically try to get to the
                 next base when there is an error, which is NOT
@@ -729,7 +927,7 @@ class BaseBallGame(BayesGame):
                 if 'third' in runners:
                     relevant_base = 'third'
                 else:
-                    relevant_base = choice(runners)
+                    relevant_base = self.rng.pick(runners)
 
                 tagged = getattr(loc, relevant_base+'base')
                 target = getattr(loc, relevant_base)
@@ -773,13 +971,15 @@ class BaseBallGame(BayesGame):
                             thrower = categorical_dist(
                                 left_side_outfield,
                                 *[pr_lf_of, pr_cf_of],
-                                predict=True
+                                predict=True,
+                                rng=self.rng
                             )
                         elif fielder.pos in in_nums[1:]:
                             thrower = categorical_dist(
                                 right_side_outfield,
                                 *[pr_cf_of, pr_rf_of],
-                                predict=True
+                                predict=True,
+                                rng=self.rng
                             )
                         elif fielder.pos in of_nums[:2]:
                             thrower = self.locations.gap
@@ -799,10 +999,11 @@ class BaseBallGame(BayesGame):
                                 if base_name == 'third':
                                     tagged = runner
                             if target == None:
-                                target = choice(runners)
+                                target = self.rng.pick(runners)
                         catch['outcome'] = Outcome(
                             catch.outcome.result,
-                            'E:{}'.format(fielder),
+                            encode(codes['game']['error'], fielder.pos,
+                                   actor=fielder.num),
                             catch.outcome.details
                         )
                 if ge.parent_name == 'throw':
@@ -815,7 +1016,8 @@ class BaseBallGame(BayesGame):
                             throw_arc(fielder, target, tagged)
                         catch['outcome'] = Outcome(
                             catch.outcome.result,
-                            'E:{}'.format(fielder),
+                            encode(codes['game']['error'], fielder.pos,
+                                   actor=fielder.num),
                             catch.outcome.details
                         )
             """End of except case for CatchEvent."""
@@ -869,27 +1071,26 @@ class BaseBallGame(BayesGame):
             fromb = base_dict[move.outcome.details['from_base']]
             tob = base_dict[move.outcome.details['to_base']]
             runner = move.outcome.details['player']
-            loc = self.locations._asdict()
+            loc = self.locations
             if move.result in ['move', 'steal']:
                 if fromb:
                     if fromb == base_dict[3]:
                         if self.gamestate.inning.order == 'top':
-                            self.action_shift('ASCORE')
+                            self.action_shift('ASCORE', [runner])
                         else:
-                            self.action_shift('HSCORE')
-                    loc[fromb] = None
+                            self.action_shift('HSCORE', [runner])
+                    setattr(loc, fromb, None)
                 if tob:
-                    loc[tob] = runner
+                    setattr(loc, tob, runner)
                     
             elif move.result == 'caught':
                 if tob:
-                    loc[tob] = None
-                loc[fromb] = None
+                    setattr(loc, tob, None)
+                setattr(loc, fromb, None)
                     
             else:
                 raise NotImplementedError
                 
-            self.locations = Locations(**loc)
             self.add_record(move.record)
             return move
 
@@ -913,19 +1114,18 @@ class BaseBallGame(BayesGame):
                 self._away_pos = next(self.away_next_bat)
                 self.batter = self.away.lineup[self._away_pos]
                 self._batter_done = False
-            for p in self.home.lineup:
-                if p.pos == Positions.index('P'):
-                    self.pitcher = p
-                    
+            self.pitcher = self.position_index['home'].get(
+                pitcher_pos, self.pitcher
+            )
         elif order == 'bottom':
             if self.batter_finished:
                 self.gamestate.update(reset=True)
                 self._home_pos = next(self.home_next_bat)
                 self.batter = self.home.lineup[self._home_pos]
                 self._batter_done = False
-            for p in self.away.lineup:
-                if p.pos == Positions.index('P'):
-                    self.pitcher = p
+            self.pitcher = self.position_index['away'].get(
+                pitcher_pos, self.pitcher
+            )
         else:
             raise Exception('Bad Inning Order {}'.format(order))
     
@@ -934,10 +1134,13 @@ class BaseBallGame(BayesGame):
         self.gamestate.update(reset_all=True)
         order = 'top' if (modf(I)[0] == 0.0) else 'bottom'
         self.gamestate.update(order=order, inning=I)
+        self.place_fielders()
             
     @property
     def play(self, debug=True):
         """Play through a pitch event."""
+        if self.fast:
+            return self.play_plate_appearance()
         self.change_lineup
         pitch = self.play_next_state(
             PitchEvent,
@@ -952,17 +1155,216 @@ class BaseBallGame(BayesGame):
             catch.append('pitch probs: \n{}'.format(pitch.probs))
             catch.append('*'*80)
             self.debug_msgs.extend(catch)
+        return self.apply_records()
+
+    def play_plate_appearance(self):
+        """Fast mode: plays the rest of the current plate appearance at
+        once.  Its result (outs, runners on base and runs) is drawn
+        from markov.plate_appearance_distribution, with the game
+        engine's counting, conditioned on the count, outs and runners.
+
+        The outs and runs are applied with <Out> and score records, and
+        the runners left on base with a PA record (see logic._set_bases).
+        The trailing runners (and the batter) stay on the field.
+
+        Returns the list of records, newest first.
+        """
+        self.change_lineup
+        locs = self.locations
+        runners = [p for p in (locs.thirdbase, locs.secondbase,
+                               locs.firstbase) if p]
+        bases = self.runners_mask()
+        count = self.gamestate.count
+        cdf = plate_appearance_cdf()[state_index(
+            min(count.balls, 3), min(count.strikes, 2), count.outs, bases
+        )]
+        k = int(np.searchsorted(cdf, self.rng.random() * cdf[-1], 'right'))
+        n_runs = len(cdf) // 32
+        outs, k = divmod(min(k, len(cdf) - 1), 8 * n_runs)
+        new_bases, runs = divmod(k, n_runs)
+
+        occupied = [(base, new_bases >> n & 1) for n, base in
+                    enumerate(('firstbase', 'secondbase', 'thirdbase'))]
+        n_on = sum(on for _, on in occupied)
+        leaving = (runners + [self.batter])[:len(runners) + 1 - n_on]
+        staying = (runners + [self.batter])[len(runners) + 1 - n_on:]
+
+        for _ in range(outs - count.outs):
+            self.add_record(encode(codes['shift']['out']))
+        top = self.gamestate.inning.order == 'top'
+        score = codes['shift']['ASCORE' if top else 'HSCORE']
+        """Runs are credited to the leading runners, in order (the last
+        one also gets any extra runs of the engine's counting)."""
+        for n in range(runs):
+            scorer = leaving[min(n, len(leaving) - 1)] if leaving \
+                else self.batter
+            self.add_record(encode(score, actor=scorer.num))
+        self.add_record(encode(codes['game']['pa'], new_bases, runs,
+                               actor=self.batter.num))
+
+        on_base = {}
+        for base, on in reversed(occupied):
+            on_base[base] = staying.pop(0) if on else None
+        locs.update(**on_base)
+        self._batter_done = True
+        return self.apply_records()
+
+    def set_event_sink(self, sink, game_id=0):
+        """Streams every record applied to the gamestate to sink, e.g.
+        an eventlog.EventLogWriter or a stats.StatsBook, as rows of
+        game_id.  Sinks with a start_game method are told the names
+        of the teams first.
+        """
+        self.event_sink = sink
+        self.game_id = game_id
+        self._seq = 0
+        start_game = getattr(sink, 'start_game', None)
+        if start_game is not None:
+            start_game(game_id, self.away.name, self.home.name)
+
+    def apply_records(self):
+        """Applies the records added since the last call to the
+        gamestate, and clears them from the deque.
+
+        Returns the list of records, newest first.
+        """
         history = []
         self.reverse()
         start = self.popleft()
         self.reverse()
         self.append(start)
+        sink = self.event_sink
+        if sink is not None:
+            pre = self.gamestate.pack()
+            batter = self.batter.num if self.batter else 0
+            pitcher = self.pitcher.num if self.pitcher else 0
         while self[0].outcome != '<START>':
             rec = self.popleft()
             self.gamestate.update_from_event_record(rec.outcome)
             history.append(rec.outcome)
+            if sink is not None:
+                code = rec.outcome
+                post = apply_packed(pre, code)
+                sink.write(self.game_id, self._seq, rec.time, code,
+                           code & 0xff, batter, pitcher, pre, post)
+                self._seq += 1
+                pre = post
         assert len(self) == 1
-        return history 
+        return history
+
+    def finish(self):
+        """Plays the game from the current gamestate to the end.
+
+        Returns the result of the game (see BaseBallGame.result).
+        """
+        if self.win_msg is not None:
+            return self.result()
+        I = self.gamestate.inning.inning
+        if I >= 1:
+            while self.gamestate.count.outs < 3:
+                self.play
+            I += .5
+        else:
+            I = 1
+        for I in count(I, .5):
+            self.upkeep(I)
+            if self.win(I):
+                break
+            while self.gamestate.count.outs < 3:
+                self.play
+        return self.result()
+
+    def _next_bat(self, side):
+        """Returns the next lineup position of a side, without
+        using up the lineup iterator.
+        """
+        name = side + '_next_bat'
+        nxt = next(getattr(self, name))
+        setattr(self, name, cycle([*range(nxt, 9), *range(nxt)]))
+        return nxt
+
+    def snapshot(self):
+        """Returns a GameSnapshot: the gamestate, lineup positions,
+        the players on the field and the random stream state, in a
+        compact (and picklable) form.
+
+        Players are stored by (side, lineup index), side 0 is away
+        and 1 is home, so a snapshot is restored onto the same teams
+        (or copies of them). Snapshots are taken between plays.
+        """
+        assert len(self) == 1, 'Snapshots are taken between plays'
+        lineups = (self.away.lineup, self.home.lineup)
+        keys = dict((id(p), (side, n))
+                    for side, lineup in enumerate(lineups)
+                    for n, p in enumerate(lineup))
+        key = lambda p: None if p is None else keys[id(p)]
+        return GameSnapshot(
+            gamestate=self.gamestate.pack(),
+            time=self.current_time,
+            win_msg=self._winmsg,
+            batter_done=self._batter_done,
+            away_pos=self._away_pos,
+            home_pos=self._home_pos,
+            away_next=self._next_bat('away'),
+            home_next=self._next_bat('home'),
+            batter=key(self.batter),
+            pitcher=key(self.pitcher),
+            locations=tuple(key(p) for p in self.locations),
+            players=tuple(tuple(p.game_state for p in lineup)
+                          for lineup in lineups),
+            rng_state=self.rng.get_state()
+        )
+
+    def restore(self, snapshot, restore_rng=True):
+        """Restores the game to a GameSnapshot.
+
+        Paramaters:
+        ==========
+        snapshot : GameSnapshot
+        restore_rng : Boolean (default: True)
+
+        - if False, the game keeps drawing from its own random stream,
+          e.g. to play a different continuation from the snapshot.
+        """
+        assert len(self) == 1, 'Snapshots are restored between plays'
+        lineups = (self.away.lineup, self.home.lineup)
+        player = lambda k: None if k is None else lineups[k[0]][k[1]]
+        self.gamestate = GameState.from_packed(snapshot.gamestate)
+        self.current_time = snapshot.time
+        self._winmsg = snapshot.win_msg
+        self._batter_done = snapshot.batter_done
+        self._away_pos = snapshot.away_pos
+        self._home_pos = snapshot.home_pos
+        self.away_next_bat = cycle(
+            [*range(snapshot.away_next, 9), *range(snapshot.away_next)]
+        )
+        self.home_next_bat = cycle(
+            [*range(snapshot.home_next, 9), *range(snapshot.home_next)]
+        )
+        self.batter = player(snapshot.batter)
+        self.pitcher = player(snapshot.pitcher)
+        self.locations = FieldLocations(*map(player, snapshot.locations))
+        for lineup, states in zip(lineups, snapshot.players):
+            for p, state in zip(lineup, states):
+                p.set_game_state(state)
+        self.index_positions('away')
+        self.index_positions('home')
+        if restore_rng:
+            self.rng.set_state(snapshot.rng_state)
+
+    @classmethod
+    def from_snapshot(cls, away_team, home_team, snapshot, rng=None):
+        """Returns a new game between two teams, restored to a
+        GameSnapshot.  If rng is None, the random stream state of
+        the snapshot is restored, otherwise the game draws from rng.
+        """
+        restore_rng = rng is None
+        if restore_rng and isinstance(snapshot.rng_state[0], dict):
+            """The snapshot was drawing from its own Generator"""
+            rng = np.random.default_rng()
+        game = cls(away_team, home_team, rng=rng)
+        game.restore(snapshot, restore_rng=restore_rng)
+        return game
 
     def manage(self):
         """Eventually, this method will define a means with which
@@ -974,6 +1376,91 @@ class BaseBallGame(BayesGame):
         return NotImplementedError
         
 
+def simulate_game(away_team=None, home_team=None, seed=None, fast=False,
+                  event_sink=None, game_id=0):
+    """Play a complete baseball game without any terminal I/O.
+
+    Paramaters:
+    ==========
+    away_team : Team (default: None)
+    home_team : Team (default: None)
+    seed : int, SeedSequence, Generator or RandomStream (default: None)
+
+    - if either team is None, random rosters are used for both teams.
+    - every random draw of the game comes from the stream built from
+      seed (see helpers.as_stream); with no seed, NumPy's global
+      random state is used.
+    - player decision flags are reset, so that a game does not depend
+      on the games the same Team instances played before it.
+
+    fast : Boolean (default: False)
+
+    - if True, the game is played in fast mode, a plate appearance at
+      a time (see BaseBallGame.play_plate_appearance).
+
+    event_sink : eventlog.EventLogWriter (default: None)
+    game_id : int (default: 0)
+
+    - if event_sink is given, every record of the game is streamed to
+      it, as rows of game_id (see BaseBallGame.set_event_sink).
+
+    Returns a GameResult, with the final GameState, the LineScore (runs
+    per inning, for each team) and the event log, which is the list of
+    every record applied to the gamestate, in the order they were played.
+    """
+    if away_team is not None and home_team is not None:
+        for team in (away_team, home_team):
+            for player in [*team.lineup, *team.roster]:
+                player.cleanup_player
+    game = BaseBallGame(away_team, home_team, False, rng=seed, fast=fast)
+    if event_sink is not None:
+        game.set_event_sink(event_sink, game_id)
+    away_runs = []
+    home_runs = []
+    events = []
+    for I in count(1, .5):
+        game.upkeep(I)
+        if game.win(I):
+            break
+        top = game.gamestate.inning.order == 'top'
+        start = game.gamestate.score
+        while game.gamestate.count.outs < 3:
+            events.extend(reversed(game.play))
+        end = game.gamestate.score
+        if top:
+            away_runs.append(end.away - start.away)
+        else:
+            home_runs.append(end.home - start.home)
+    line_score = LineScore(tuple(away_runs), tuple(home_runs))
+    return GameResult(game.gamestate, line_score, events)
+
+def validate_fast_mode(games=200, seed=0, max_runs=10):
+    """Compares fast mode games with full fidelity games, played from
+    the same seeds.
+
+    Returns a dict like batch.validate: the runs per half inning of
+    fast games against full games (z score of the difference of means,
+    and total variation distance), and the home win fractions.
+    """
+    from batch import compare_runs
+    from helpers import spawn_seeds
+    runs = {}
+    home_wins = {}
+    for fast in (True, False):
+        runs[fast] = []
+        home_wins[fast] = 0
+        for s in spawn_seeds(seed, games):
+            result = simulate_game(seed=s, fast=fast)
+            runs[fast].extend(result.line_score.away)
+            runs[fast].extend(result.line_score.home)
+            score = result.gamestate.score
+            home_wins[fast] += score.home > score.away
+    report = compare_runs(np.array(runs[True]), np.array(runs[False]),
+                          max_runs)
+    report.update(home_win=home_wins[True] / games,
+                  reference_home_win=home_wins[False] / games)
+    return report
+
 def play_baseball_game():
     """Watch a baseball game get played."""
     os.system('clear||clr')
@@ -1000,4 +1487,6 @@ def play_baseball_game():
     input('\n bayesball instance finished. \n press enter to exit.')
 
 if __name__ == '__main__':
+    import logging
+    logging.basicConfig(level=logging.INFO)
     play_baseball_game()
\ No newline at end of file
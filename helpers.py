@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from numpy.random import choice, permutation
+import numpy as np
 import context as con
-from collections import namedtuple
+from collections import namedtuple, Counter
 from copy import deepcopy
+from functools import lru_cache
 
 """Written by:  Christopher F. French
         email:  cffrench.writes@gmail.com
@@ -31,6 +32,168 @@ along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
 --------------------------------------------------------------------------------
 """
 
+class AliasSampler(object):
+    """Walker/Vose alias table for a fixed categorical distribution.
+
+    The table is built once, in O(n), after which every draw costs
+    a single uniform random number and one comparison.
+
+    Paramaters:
+    ----------
+    labels : sequence of outcomes
+    probs : sequence of probabilities, one for each label
+    """
+    __slots__ = ('labels', 'probs', '_n', '_cut', '_alias')
+
+    def __init__(self, labels, probs):
+        assert len(labels) == len(probs) and len(labels) > 0
+        self.labels = tuple(labels)
+        self.probs = tuple(probs)
+        n = len(probs)
+        total = float(sum(probs))
+        scaled = [p * n / total for p in probs]
+        cut = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            cut[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        self._n = n
+        self._cut = cut
+        self._alias = alias
+
+    def draw(self, u):
+        """Returns the label selected by the uniform number u in [0, 1)."""
+        x = u * self._n
+        i = int(x)
+        if x - i < self._cut[i]:
+            return self.labels[i]
+        return self.labels[self._alias[i]]
+
+@lru_cache(maxsize=4096)
+def compile_sampler(labels, probs):
+    """Returns the (cached) AliasSampler for the tuples labels, probs."""
+    return AliasSampler(labels, probs)
+
+def prior_sampler(prior):
+    """Returns the (cached) AliasSampler for a prior namedtuple or dict."""
+    if isinstance(prior, dict):
+        return compile_sampler(tuple(prior), tuple(prior.values()))
+    return compile_sampler(prior._fields, tuple(prior))
+
+class RandomStream(object):
+    """A stream of random draws for a single simulation.
+
+    Every random decision made during a game (event outcomes,
+    player decisions, fielder choices, ...) is drawn from the
+    RandomStream the game was built with.
+
+    Uniform numbers are generated *buffer_size* at a time, and
+    handed out one by one by RandomStream.random.
+
+    Paramaters:
+    ----------
+    generator : numpy.random.Generator (default: None)
+    buffer_size : int (default: 1024)
+
+    If generator is None, NumPy's global random state is used,
+    so that np.random.seed still controls the simulation. In that
+    case uniform numbers are not buffered.
+    """
+    __slots__ = ('generator', 'buffer_size', '_buffer', '_pos', '_refill')
+
+    def __init__(self, generator=None, buffer_size=1024):
+        if generator is None:
+            generator = np.random
+            buffer_size = 0
+        self.generator = generator
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._pos = 0
+        self._refill = None
+
+    def choice(self, a, size=None, replace=True, p=None):
+        return self.generator.choice(a, size, replace, p)
+
+    def permutation(self, x):
+        return self.generator.permutation(x)
+
+    def random(self):
+        """Returns a uniform random number in [0, 1)."""
+        pos = self._pos
+        if pos == len(self._buffer):
+            if not self.buffer_size:
+                return self.generator.random()
+            self._refill = self.generator.bit_generator.state
+            self._buffer = self.generator.random(self.buffer_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return self._buffer[pos]
+
+    def pick(self, seq):
+        """Returns a uniformly chosen element of the sequence seq."""
+        return seq[int(self.random() * len(seq))]
+
+    def categorical(self, sampler):
+        """Returns a label drawn from an AliasSampler."""
+        return sampler.draw(self.random())
+
+    def get_state(self):
+        """Returns the state of the stream: the generator state, the
+        generator state from before the last buffer refill, and the
+        number of uniforms used from the buffer.
+
+        The buffer itself is not stored: it is drawn again from the
+        refill state when the state is restored.
+        """
+        if self.generator is np.random:
+            return (np.random.get_state(), None, 0)
+        state = self.generator.bit_generator.state
+        return (state, self._refill, self._pos)
+
+    def set_state(self, state):
+        """Restores a state returned by RandomStream.get_state."""
+        generator_state, refill_state, pos = state
+        if self.generator is np.random:
+            np.random.set_state(generator_state)
+            return
+        bit_generator = self.generator.bit_generator
+        self._buffer = []
+        self._pos = 0
+        self._refill = refill_state
+        if refill_state is not None:
+            bit_generator.state = refill_state
+            self._buffer = self.generator.random(self.buffer_size).tolist()
+            self._pos = pos
+        bit_generator.state = generator_state
+
+global_stream = RandomStream()
+
+def as_stream(rng=None):
+    """Returns a RandomStream from rng, which can be None (the global
+    stream), a RandomStream, a numpy.random.Generator, or a seed
+    (an int or numpy.random.SeedSequence) for a new Generator.
+    """
+    if rng is None:
+        return global_stream
+    if isinstance(rng, RandomStream):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return RandomStream(rng)
+    return RandomStream(np.random.default_rng(rng))
+
+def spawn_seeds(seed, n):
+    """Returns n independent SeedSequences spawned from the root seed."""
+    return np.random.SeedSequence(seed).spawn(n)
+
 """Not used"""
 def bbdata(velocity=86, angle=45, z_spin=.2, y_spin=.2):
     return BaseBall(
@@ -55,6 +218,8 @@ def sample_on(name, *args):
         # needs to be fixed
         return 80. * np.random.sample() + 20.
     elif name == 'trunc_mu':
+        """SciPy is slow to import, so it is only imported when needed"""
+        from scipy.stats import truncnorm
         mu = args[0]
         return truncnorm.rvs(20.-mu, 100.-mu, loc=mu)
     elif name == 'choice':
@@ -83,20 +248,34 @@ def match_array(rec, array):
 - categorical_dist
 - gappy_to_probs
 - populate_random_roster
+- populate_random_league
 """
     
+"""Number of namedtuple classes created at runtime, by typename.
+
+Classes are expensive to build, so the game loop should never build
+them: a simulated game should leave this Counter unchanged.
+"""
+namedtuple_factory_calls = Counter()
+
+def counted_namedtuple(typename, field_names, **kwargs):
+    """collections.namedtuple, counted in namedtuple_factory_calls."""
+    namedtuple_factory_calls[typename] += 1
+    return namedtuple(typename, field_names, **kwargs)
+
+"""Subjects namedtuple class of each action type, built once from
+context.action_context_format.
+"""
+subject_types = dict(
+    (action, counted_namedtuple('Subjects', con.action_context_format[n]))
+    for n, action in enumerate(con.actions)
+)
+
 def build_subjects(action, *subjects):
-    if subjects is None:
-        return namedtuple('Subjects')
-    fieldnames = con.action_context_format.get(
-            con.actions.index(action)
-    )
-    try:
-        assert len(fieldnames) == len(subjects)
-    except:
-        print(fieldnames, subjects)
-    Subjects = namedtuple('Subjects', fieldnames)
-    return Subjects(*subjects)
+    """Returns the Subjects namedtuple of an action, e.g.
+    build_subjects('throw', ball, thrower, target).
+    """
+    return subject_types[action](*subjects)
 
     
 """Conditional probabilities over dict probs.
@@ -125,7 +304,50 @@ def cond_dampen(probs, sub = [], cond = 0):
         print('Bad Conditional Dampening over Probs.')
     return probs
 
-def categorical_dist(labels, *scalars, predict=False):
+"""Probability vectors.
+
+NumPy forms of cond_dampen and renormalisation. The last axis of every
+array runs over the outcome labels, so a matrix (n, K) holds n
+distributions, which are all transformed in one call.
+"""
+def label_mask(labels, sub):
+    """Returns the boolean mask of the labels that are in sub."""
+    sub = frozenset(sub)
+    return np.array([label in sub for label in labels], dtype=bool)
+
+def dampen_probs(probs, mask, cond=0.):
+    """Vector form of cond_dampen: the outcomes in mask get the
+    probability cond, and their previous mass is shared evenly by the
+    other outcomes.
+
+    probs : array (..., K)
+    mask : boolean array (K,) or (..., K)
+    """
+    probs = np.asarray(probs, dtype=float)
+    mask = np.broadcast_to(mask, probs.shape)
+    moved = np.where(mask, probs, 0.).sum(axis=-1, keepdims=True)
+    free = (~mask).sum(axis=-1, keepdims=True)
+    return np.where(mask, cond, probs + moved / free)
+
+def modify_probs(probs, modifiers):
+    """Adds modifiers (array broadcastable to probs) to probs."""
+    return np.asarray(probs, dtype=float) + modifiers
+
+def renormalise(probs):
+    """Scales every distribution in probs to sum to one."""
+    probs = np.asarray(probs, dtype=float)
+    return probs / probs.sum(axis=-1, keepdims=True)
+
+def sample_probs(probs, u):
+    """Returns the outcome index drawn from each distribution in probs
+    (array (n, K)) by the uniform numbers u (array (n,)), by inverting
+    the cumulative distributions.
+    """
+    cdf = np.cumsum(probs, axis=-1)
+    index = (cdf < np.asarray(u)[..., None] * cdf[..., -1:]).sum(axis=-1)
+    return np.minimum(index, cdf.shape[-1] - 1)
+
+def categorical_dist(labels, *scalars, predict=False, rng=None):
     N = len(scalars)
     S = float(sum(scalars))
     probs = [0]*N
@@ -133,11 +355,12 @@ def categorical_dist(labels, *scalars, predict=False):
         probs[x] = scalars[x]/S
     probs[N-1] = 1-sum(probs)
     if predict:
-        return choice(labels, p=probs)
+        sampler = compile_sampler(tuple(labels), tuple(probs))
+        return as_stream(rng).categorical(sampler)
     prob_dist = dict(zip(labels, probs))
     return prob_dist
 
-def gappy_to_probs(gaps, prob_dist):
+def gappy_to_probs(gaps, prob_dist, rng=None):
     probs = {}
     for name, vals in gaps.items():
         if vals != []:
@@ -146,16 +369,23 @@ def gappy_to_probs(gaps, prob_dist):
     return categorical_dist(
         probs.labels(),
         *list(probs.values()),
-        predict=True
+        predict=True,
+        rng=rng
     )
 
-def populate_random_roster(rostersize, player_cls, Positions, Team):
-    """quick and dirty way to build teams, including roster/lineup"""
+def populate_random_roster(rostersize, player_cls, Positions, Team, rng=None,
+                           table=None):
+    """quick and dirty way to build teams, including roster/lineup
+
+    table : player.PlayerTable (default: None), shared by the players
+    """
     assert rostersize >= 9
+    rng = as_stream(rng)
+    kwargs = {} if table is None else dict(table=table)
     assert isinstance(Positions, list)
     # randomly choose twenty five numbers, for player numbers.
     def nums():
-        rand_nums = permutation(
+        rand_nums = rng.permutation(
             list(frozenset(range(100))-set([42, 0]))
         )
         return list(rand_nums)[:rostersize]
@@ -173,12 +403,14 @@ def populate_random_roster(rostersize, player_cls, Positions, Team):
     for x, pos in enumerate(Positions[1:10]):
         home_lineup.append(
             player_cls(
-                home_nums[x], pos, home_name, 50, 20, 100
+                home_nums[x], pos, home_name, 50, 20, 100, rng=rng,
+                **kwargs
             )
         )
         away_lineup.append(
             player_cls(
-                away_nums[x], pos, away_name, 50, 20, 100
+                away_nums[x], pos, away_name, 50, 20, 100, rng=rng,
+                **kwargs
             )
         )
         if pos == 'P':
@@ -187,15 +419,93 @@ def populate_random_roster(rostersize, player_cls, Positions, Team):
             away_pit = away_lineup[n-1]
     for z in range(9, 25):
         home_bench.append(
-            player_cls(home_nums[z], 'Bench', home_name, 50, 20, 100)
+            player_cls(home_nums[z], 'Bench', home_name, 50, 20, 100, rng=rng,
+                       **kwargs)
         )
         away_bench.append(
-            player_cls(away_nums[z], 'Bench', away_name, 50, 20, 100)
+            player_cls(away_nums[z], 'Bench', away_name, 50, 20, 100, rng=rng,
+                       **kwargs)
         )
 
-    home_lineup = permutation(home_lineup)
-    away_lineup = permutation(away_lineup)
+    home_lineup = rng.permutation(home_lineup)
+    away_lineup = rng.permutation(away_lineup)
 
     home = Team(home_name, home_lineup, home_bench)
     away = Team(away_name, away_lineup, away_bench)    
-    return home, away
\ No newline at end of file
+    return home, away
+
+def populate_random_league(n_teams, player_cls, Positions, Team,
+                           rostersize=25, rng=None, names=None, table=None,
+                           stren=50, move=20, fatig=100):
+    """Builds a league of random teams, like populate_random_roster,
+    drawing every team's numbers, lineup order and pitch repertoires
+    with a few array operations.
+
+    Paramaters:
+    ==========
+    n_teams : int
+    player_cls : class with a table_cls and a from_row, e.g.
+        player.BaseBallPlayer
+    Positions : list of position names
+    Team : namedtuple class of (name, lineup, roster)
+    rostersize : int (default: 25)
+    rng : as_stream argument (default: None)
+    names : list of n_teams team names (default: 'Team 1', 'Team 2', ...)
+    table : player table (default: None, i.e. a new one), to which the
+        players are added
+    stren, move, fatig : attributes, scalars or arrays broadcastable to
+        (n_teams, rostersize)
+
+    Returns the list of Teams.  The same rng seed gives the same league.
+    """
+    assert 9 <= rostersize <= 98
+    rng = as_stream(rng)
+    gen = rng.generator
+    if names is None:
+        names = ['Team {}'.format(i + 1) for i in range(n_teams)]
+    assert len(names) == n_teams
+    if table is None:
+        table = player_cls.table_cls(n_teams * rostersize)
+    n = n_teams * rostersize
+    K = len(con.pitch_types)
+
+    """Numbers: the first rostersize of a permutation per team"""
+    allowed = np.array(sorted(frozenset(range(100)) - set([42, 0])))
+    order = np.argsort(gen.random((n_teams, len(allowed))), axis=1)
+    nums = allowed[order[:, :rostersize]]
+
+    """Positions: the nine fielders, then the bench"""
+    pos = np.full(rostersize, Positions.index('Bench'))
+    pos[:9] = [Positions.index(p) for p in Positions[1:10]]
+    lineups = np.argsort(gen.random((n_teams, 9)), axis=1)
+
+    """Pitch repertoires: the first k of a permutation, 0 < k <= K"""
+    k = 1 + (gen.random(n) * K).astype(int)
+    types = np.argsort(gen.random((n, K)), axis=1)
+    types[np.arange(K) >= k[:, None]] = -1
+
+    first = table.add_rows(n)
+    rows = slice(first, first + n)
+    table.num[rows] = nums.ravel()
+    table.pos[rows] = np.tile(pos, n_teams)
+    table.team[rows] = np.repeat(np.array(names, dtype=object), rostersize)
+    shape = (n_teams, rostersize)
+    table.strength[rows] = np.broadcast_to(stren, shape).ravel()
+    table.movement[rows] = np.broadcast_to(move, shape).ravel()
+    table.fatigue[rows] = np.broadcast_to(fatig, shape).ravel()
+    table.swung[rows] = False
+    table.leadoff[rows] = False
+    table.steal[rows] = False
+    table.pick_off[rows] = False
+    table.pickoff_location[rows] = None
+    table.onbase[rows] = -1
+    table.pitch_types[rows] = types
+
+    players = [player_cls.from_row(table, row)
+               for row in range(first, first + n)]
+    teams = []
+    for t, name in enumerate(names):
+        roster = players[t * rostersize:(t + 1) * rostersize]
+        lineup = [roster[i] for i in lineups[t]]
+        teams.append(Team(name, lineup, roster[9:]))
+    return teams
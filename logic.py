@@ -25,8 +25,8 @@ along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
 --------------------------------------------------------------------------------
 """
 from collections import namedtuple
-from context import outcome_records
-from helpers import match, match_array
+import numpy as np
+from records import parse_record, record_names, record_types
 
 """Basic namedtuples for building a gamestate"""
 Lineup = namedtuple('Lineup', ['batting_order', 'current_pitcher'])
@@ -42,6 +42,11 @@ bases_lab = ['third', 'second', 'first']
 Bases = namedtuple('Bases', bases_lab)
 state_types = [Score, Inning, Count, Bases]
 game_state_labels = score_lab + inning_lab + count_lab + bases_lab
+_field_states = dict(
+    (field, state_name)
+    for state_name, state_tuple in zip(state_labs, state_types)
+    for field in state_tuple._fields
+)
 score_zero  = Score(0, 0)
 inning_zero = Inning(inning_order[0], 0)
 count_zero  = Count(0, 0, 0)
@@ -95,10 +100,15 @@ def move_n(n, first, second, third, score):
 class GameState(object):
     """Class for keeping tracking of a baseball state, and
     which then gets updates for each and every BayesEvent,
-    represented as a record string.
+    represented as an event record (see records.py).
     """
     __slots__ = ('score', 'inning', 'count', 'bases')
 
+    """If True, the gamestate is checked (see GameState.check)
+    after every update. This is off by default, since it is slow.
+    """
+    validate = False
+
     def __init__(self, **initial_params):
         super().__init__()
         self.score = initial_params.get('score', score_zero)
@@ -133,22 +143,31 @@ class GameState(object):
             if reset_all:
                 self.bases = bases_zero
                 self.count = count_zero
-            
-
-        state_dict = dict(zip(state_labs, state_types))
-        for state_name, state_tuple in state_dict.items():
-            catch = {}
-            for field in state_tuple._fields:
-                try:
-                    catch[field] = params[field]
-                except:
-                    catch[field] = getattr(
-                        getattr(self, state_name), field
-                    )
-            self.__setattr__(
-                state_name, state_dict[state_name](**catch)
-            )
 
+        """Only the namedtuples with updated fields are rebuilt."""
+        changed = {}
+        for field, value in params.items():
+            state_name = _field_states.get(field)
+            if state_name is not None:
+                changed.setdefault(state_name, {})[field] = value
+        for state_name, fields in changed.items():
+            setattr(self, state_name,
+                    getattr(self, state_name)._replace(**fields))
+
+        if self.validate:
+            self.check()
+
+    def pack(self):
+        """Returns the gamestate packed into an int (see pack_state)."""
+        return pack_state(self)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """Returns a new GameState from a packed gamestate."""
+        return unpack_state(packed)
+
+    def check(self):
+        """Asserts that the gamestate is a valid baseball state."""
         assert 0 <= self.score.home
         assert 0 <= self.score.away
         assert 0 <= self.inning.inning
@@ -163,122 +182,302 @@ class GameState(object):
 
     def update_from_event_record(self, result):
         """
-        Updating GameState from a GameEvent record.
+        Updating GameState from a GameEvent record, which is either
+        an EventCode (see records.py) or a record string.
         """
-        assert isinstance(result, str)
-
-        """constants"""
-        outs = self.count.outs
-        balls = self.count.balls
-        strikes = self.count.strikes
-        first = self.bases.first
-        second = self.bases.second
-        third = self.bases.third
-        home_score = self.score.home
-        away_score = self.score.away
-        inning = self.inning.inning
-        order = self.inning.order
-        rel_score = 0
-
-        precs = outcome_records['pitch']
-        
-        # print('Scoring result: {}'.format(result))
-
-        """Game result record cases:"""
-        if result in precs['strike'].values():
-            strikes+=1
-        elif result in precs['strikeout'].values():
-            strikes+=1
-        elif result in precs['ball'].values():
-            balls+=1
-        elif result in precs['walk'].values():
-            balls+=1
-        elif result == precs['wild']['wp']:
-            balls+=1
-        elif result in precs['hbp'].values():
-            pass
-        elif result in precs['contact']['foul'].values():
-            if strikes < 2:
-                strikes+=1
-        elif result in precs['contact']['oop'].values():
-            pass
-        elif result in precs['contact']['hit'].values():
-            pass
-        elif result in precs['contact']['bunt'].values():
-            pass
-        elif match_array(result, precs['outs'].values()):
-            pass
-        elif result == outcome_records['shift']['out']:
-            outs+=1
-        elif result == outcome_records['shift']['HSCORE']:
-            home_score+=1
-        elif result == outcome_records['shift']['ASCORE']:
-            away_score+=1
-        elif match(result, outcome_records['tag']['safe']):
-            pass
-        elif match(result, outcome_records['tag']['out']):
-            outs+=1
-        elif match_array(result, outcome_records['move'].values()):
-            if match(result, outcome_records['move']['caught']):
-                fromb, tob = result.split(':caught:')
-
-                fromb = int(fromb)
-                tob= int(tob)
-                
-                if fromb == 1:
-                    first = 0
-                if fromb == 2:
-                    second = 0
-                if fromb == 3:
-                    third = 0
-            else:
-                if match(result, outcome_records['move']['move']):
-                    fromb, tob = result.split(':move:')
-                elif match(result, outcome_records['move']['steal']):
-                    fromb, tob = result.split(':steal:')
-                else:
-                    raise ValueError
-
-                fromb = int(fromb)
-                tob= int(tob)
-                
-                if fromb == 1:
-                    first = 0
-                if fromb == 2:
-                    second = 0
-                if fromb == 3:
-                    third = 0
-                if tob == 1:
-                    first = 1
-                if tob == 2:
-                    second = 1
-                if tob == 3:
-                    third = 1
-                if tob == 4:
-                    rel_score+=1
+        if isinstance(result, str):
+            result = parse_record(result, strict=False)
+            if result is None:
+                """Unknown records don't change the gamestate."""
+                return
+        self.update_from_event_code(result)
+
+    def update_from_event_code(self, code):
+        """
+        Updating GameState from an integer event code, using the
+        transition of its record type (see state_transitions).
+        """
+        transition = state_transitions[code >> 24]
+        if transition is not None:
+            transition(self, code)
+            if self.validate:
+                self.check()
+
+
+"""Packed gamestates.
+
+A gamestate can be packed into a single (64 bit) integer:
+
+    bits  0-2  : bases, as a mask (1: first, 2: second, 4: third)
+    bits  3-4  : strikes
+    bits  5-7  : balls
+    bits  8-9  : outs
+    bit   10   : half inning (0: top, 1: bottom)
+    bits 11-18 : inning, counted in half innings (i.e. 2 * inning)
+    bits 19-26 : away score
+    bits 27-34 : home score
+
+so that millions of states can be stored in arrays, hashed cheaply,
+and used as table indices. state_dtype is the same layout as a
+NumPy structured dtype.
+"""
+packed_layout = dict(
+    bases=(0, 3), strikes=(3, 2), balls=(5, 3), outs=(8, 2),
+    half=(10, 1), inning=(11, 8), away=(19, 8), home=(27, 8)
+)
+packed_fields = tuple(packed_layout)
+state_dtype = np.dtype([(name, np.uint8) for name in packed_fields])
+packed_dtype = np.uint64
+
+BASES_SHIFT = packed_layout['bases'][0]
+STRIKES_SHIFT = packed_layout['strikes'][0]
+BALLS_SHIFT = packed_layout['balls'][0]
+OUTS_SHIFT = packed_layout['outs'][0]
+HALF_SHIFT = packed_layout['half'][0]
+INNING_SHIFT = packed_layout['inning'][0]
+AWAY_SHIFT = packed_layout['away'][0]
+HOME_SHIFT = packed_layout['home'][0]
+
+"""Exclusive upper bound of each packed field"""
+_packed_limits = dict((name, 1 << bits)
+                      for name, (shift, bits) in packed_layout.items())
+
+def bases_mask(bases):
+    """Returns the Bases namedtuple as a 3 bit mask."""
+    return bases.first | (bases.second << 1) | (bases.third << 2)
+
+def mask_bases(mask):
+    """Returns the Bases namedtuple of a 3 bit mask."""
+    return Bases((mask >> 2) & 1, (mask >> 1) & 1, mask & 1)
+
+def base_out_index(outs, mask):
+    """Returns the index (0-23) of a base/out state."""
+    return outs * 8 + mask
+
+def count_index(balls, strikes):
+    """Returns the index (0-11) of a ball/strike count."""
+    return balls * 3 + strikes
+
+def pack_fields(bases=0, strikes=0, balls=0, outs=0,
+                half=0, inning=0, away=0, home=0):
+    """Returns a packed gamestate from its (int) fields.
+
+    Raises ValueError if a field does not fit in its bits (see
+    packed_layout), instead of overflowing into the next field.
+    """
+    fields = (bases, strikes, balls, outs, half, inning, away, home)
+    for name, value in zip(packed_fields, fields):
+        if not 0 <= value < _packed_limits[name]:
+            raise ValueError(
+                'Gamestate {} = {} does not fit in a packed state.'.format(
+                    name, value)
+            )
+    return (bases | (strikes << STRIKES_SHIFT) | (balls << BALLS_SHIFT)
+            | (outs << OUTS_SHIFT) | (half << HALF_SHIFT)
+            | (inning << INNING_SHIFT) | (away << AWAY_SHIFT)
+            | (home << HOME_SHIFT))
+
+def packed_field(packed, name):
+    """Returns the field name of a packed gamestate (or array of them)."""
+    shift, bits = packed_layout[name]
+    return (packed >> shift) & ((1 << bits) - 1)
+
+def pack_state(gs):
+    """Returns a GameState packed into an int."""
+    return pack_fields(
+        bases_mask(gs.bases), gs.count.strikes, gs.count.balls,
+        gs.count.outs, inning_order.index(gs.inning.order),
+        int(round(2 * gs.inning.inning)), gs.score.away, gs.score.home
+    )
+
+def unpack_state(packed):
+    """Returns the GameState of a packed gamestate."""
+    packed = int(packed)
+    field = dict((name, packed_field(packed, name)) for name in packed_fields)
+    inning = field['inning']
+    inning = inning // 2 if inning % 2 == 0 else inning / 2
+    return GameState(
+        score=Score(field['away'], field['home']),
+        inning=Inning(inning_order[field['half']], inning),
+        count=Count(field['strikes'], field['balls'], field['outs']),
+        bases=mask_bases(field['bases'])
+    )
+
+def packed_to_array(packed):
+    """Returns an array of packed gamestates as a structured array."""
+    packed = np.asarray(packed, dtype=packed_dtype)
+    states = np.empty(packed.shape, dtype=state_dtype)
+    for name in packed_fields:
+        states[name] = packed_field(packed, name)
+    return states
+
+def array_to_packed(states):
+    """Returns a structured array of gamestates as packed gamestates."""
+    packed = np.zeros(states.shape, dtype=packed_dtype)
+    for name in packed_fields:
+        shift = packed_layout[name][0]
+        packed |= states[name].astype(packed_dtype) << packed_dtype(shift)
+    return packed
+
+"""Packed gamestate transitions, by record type.
+
+These are the transitions in state_transitions, for packed gamestates:
+each takes a packed gamestate and an event code, and returns the next
+packed gamestate.
+"""
+_base_bits = {1: 1, 2: 2, 3: 4}
+
+def _packed_add_strike(packed, code):
+    return packed + (1 << STRIKES_SHIFT)
+
+def _packed_add_ball(packed, code):
+    return packed + (1 << BALLS_SHIFT)
+
+def _packed_add_foul(packed, code):
+    if packed_field(packed, 'strikes') < 2:
+        return packed + (1 << STRIKES_SHIFT)
+    return packed
+
+def _packed_add_out(packed, code):
+    if packed_field(packed, 'outs') < 3:
+        return packed + (1 << OUTS_SHIFT)
+    return packed
+
+def _packed_add_home_score(packed, code):
+    return packed + (1 << HOME_SHIFT)
+
+def _packed_add_away_score(packed, code):
+    return packed + (1 << AWAY_SHIFT)
+
+def _packed_move_runner(packed, code):
+    fromb = (code >> 16) & 0xff
+    tob = (code >> 8) & 0xff
+    packed &= ~_base_bits.get(fromb, 0)
+    packed |= _base_bits.get(tob, 0)
+    if tob == 4:
+        if (packed >> HALF_SHIFT) & 1:
+            packed += 1 << HOME_SHIFT
         else:
-            """
-            All the other outcome results won't directly change
-            the gamescore, or have already been counted: the
-            outcomes like 'ASCORE' or 'HSCORE' or 'OUT' are
-            used for the recorder, but not here.
+            packed += 1 << AWAY_SHIFT
+    return packed
+
+def _packed_remove_runner(packed, code):
+    return packed & ~_base_bits.get((code >> 16) & 0xff, 0)
+
+def _packed_set_bases(packed, code):
+    bases = (code >> 16) & 7
+    return (packed & ~(7 << BASES_SHIFT)) | (bases << BASES_SHIFT)
+
+def apply_packed(packed, code):
+    """Returns the packed gamestate after the event code."""
+    transition = packed_transitions[code >> 24]
+    if transition is None:
+        return packed
+    return transition(packed, code)
 
-            So they are ignored.
-            """
-            # print('Warning: ignored record {}'.format(result))
+"""Gamestate transitions, by record type.
 
+Each transition updates a GameState in place from an event code,
+rebuilding only the namedtuples that change.
+"""
+def _add_strike(gs, code):
+    count = gs.count
+    gs.count = Count(count.strikes+1, count.balls, count.outs)
+
+def _add_ball(gs, code):
+    count = gs.count
+    gs.count = Count(count.strikes, count.balls+1, count.outs)
+
+def _add_foul(gs, code):
+    count = gs.count
+    if count.strikes < 2:
+        gs.count = Count(count.strikes+1, count.balls, count.outs)
+
+def _add_out(gs, code):
+    count = gs.count
+    outs = 3 if count.outs >= 3 else count.outs+1
+    gs.count = Count(count.strikes, count.balls, outs)
+
+def _add_home_score(gs, code):
+    gs.score = Score(gs.score.away, gs.score.home+1)
+
+def _add_away_score(gs, code):
+    gs.score = Score(gs.score.away+1, gs.score.home)
+
+def _move_runner(gs, code):
+    """The runner on base a moves to base b (4 is a run)."""
+    fromb = (code >> 16) & 0xff
+    tob = (code >> 8) & 0xff
+    third, second, first = gs.bases
+    if fromb == 1:
+        first = 0
+    elif fromb == 2:
+        second = 0
+    elif fromb == 3:
+        third = 0
+    if tob == 1:
+        first = 1
+    elif tob == 2:
+        second = 1
+    elif tob == 3:
+        third = 1
+    gs.bases = Bases(third, second, first)
+    if tob == 4:
+        order = gs.inning.order
         if order == inning_order[0]:
-            away_score+=rel_score
+            _add_away_score(gs, code)
         elif order == inning_order[1]:
-            home_score+=rel_score
+            _add_home_score(gs, code)
         else:
             raise ValueError
 
-        outs = 3 if outs > 3 else outs # is this needed!? 
-        self.update(home=home_score, away=away_score,
-                    outs=outs, strikes=strikes, balls=balls, 
-                    first=first, second=second, third=third)
-        
+def _remove_runner(gs, code):
+    """The runner on base a is caught stealing."""
+    fromb = (code >> 16) & 0xff
+    third, second, first = gs.bases
+    if fromb == 1:
+        first = 0
+    elif fromb == 2:
+        second = 0
+    elif fromb == 3:
+        third = 0
+    gs.bases = Bases(third, second, first)
+
+def _set_bases(gs, code):
+    """The runners after a plate appearance: a is the mask of the
+    occupied bases (1: first, 2: second, 4: third)."""
+    bases = (code >> 16) & 0xff
+    gs.bases = Bases(bases >> 2 & 1, bases >> 1 & 1, bases & 1)
+
+"""
+All the other outcome results won't directly change
+the gamescore, or have already been counted. So they
+have no transition, and are ignored.
+"""
+_transition_rules = (
+    ('pitch.strike', _add_strike, _packed_add_strike),
+    ('pitch.strikeout', _add_strike, _packed_add_strike),
+    ('pitch.ball', _add_ball, _packed_add_ball),
+    ('pitch.walk', _add_ball, _packed_add_ball),
+    ('pitch.wild.wp', _add_ball, _packed_add_ball),
+    ('pitch.contact.foul', _add_foul, _packed_add_foul),
+    ('shift.out', _add_out, _packed_add_out),
+    ('shift.HSCORE', _add_home_score, _packed_add_home_score),
+    ('shift.ASCORE', _add_away_score, _packed_add_away_score),
+    ('tag.out', _add_out, _packed_add_out),
+    ('move.move', _move_runner, _packed_move_runner),
+    ('move.steal', _move_runner, _packed_move_runner),
+    ('move.caught', _remove_runner, _packed_remove_runner),
+    ('game.pa', _set_bases, _packed_set_bases)
+)
+
+state_transitions = [None] * len(record_names)
+packed_transitions = [None] * len(record_names)
+for _prefix, _transition, _packed_transition in _transition_rules:
+    for _rtype in record_types(_prefix):
+        state_transitions[_rtype] = _transition
+        packed_transitions[_rtype] = _packed_transition
+
 if __name__ == '__main__':
     a = GameState()
     a.update(outs=2, order='bottom', strikes=2, first=1)
@@ -287,5 +486,7 @@ if __name__ == '__main__':
     print(a)
     a.update_from_event_record('1:move:3')
     print(a)
+    packed = a.pack()
+    print(packed, GameState.from_packed(packed))
     
     
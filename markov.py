@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+from collections import namedtuple
+import numpy as np
+
+import context as con
+from actions import PitchEvent, CatchEvent, ThrowEvent, TagEvent
+from player import swing_sampler, leadoff_sampler, steal_sampler, \
+    pickoff_sampler
+from logic import base_out_index, count_index
+from records import hit_bases
+
+"""Exact half-inning engine.
+
+The event priors (PitchEvent, CatchEvent, ThrowEvent, TagEvent and the
+player decisions) define a Markov chain over the 24 base/out states
+times the 12 ball/strike counts.  Instead of sampling it, this module
+builds the pitch-by-pitch transition matrices over those 288 states and
+solves for expected runs (the RE24 table) and run distributions.
+
+State index:  base_out_index(outs, bases) * 12 + count_index(balls, strikes)
+
+where bases is the occupied base mask (first=1, second=2, third=4), as
+in logic.py.  Three outs is the absorbing state.
+
+The chain follows the play rules in BaseBallGame.play_next_state, with
+every run and every out counted exactly once.  Where the game engine
+double counts, the chain differs from it:
+
+- a runner scoring from third is one run (not a move plus <HomeScore>)
+- a tag out is one out, and removes the runner from the base
+- a foul ball adds (at most) one strike
+- a wild pitch on ball four is a walk
+
+pitch_transitions(..., engine=True) follows the game engine's counting
+instead (see pitch_transitions), for engines that have to reproduce
+BaseBallGame, like batch.py.
+"""
+
+N_COUNTS = 12
+N_STATES = 24 * N_COUNTS
+
+"""Most runs that can score on one pitch (a grand slam)."""
+MAX_RUNS_PER_PITCH = 4
+
+_base_bit = {1: 1, 2: 2, 3: 4}
+
+ChainModel = namedtuple('ChainModel', [
+    'swing', 'guess', 'pitch', 'contact', 'hit', 'oop',
+    'catch', 'throw', 'tag', 'leadoff', 'steal', 'pickoff'
+])
+
+def _prob(sampler, label):
+    return dict(zip(sampler.labels, sampler.probs))[label]
+
+def _normed(priors):
+    total = float(sum(priors.values()))
+    return dict((k, v / total) for k, v in priors.items())
+
+def event_model(guess=None):
+    """Reads a ChainModel off the event priors and player decisions.
+
+    Paramaters:
+    ==========
+    guess : float (default: None)
+
+    - the chance the batter guesses the pitch type.  Players throw
+      a random number of the pitch types in context.pitch_types, and
+      the batter guesses one of them at random, so by default this is
+      the average of 1/k over the repertoire sizes k.
+    """
+    if guess is None:
+        sizes = range(1, len(con.pitch_types) + 1)
+        guess = sum(1. / k for k in sizes) / len(sizes)
+    unit = PitchEvent.modifier_unit
+    pitch = {}
+    for swung in (True, False):
+        for guessed in (True, False):
+            """The batter gets a unit for guessing the pitch type (or the
+            pitcher does), plus two units from the location check.
+            """
+            batter_mod = unit * guessed + 2 * unit
+            pitcher_mod = unit * (not guessed)
+            pitch[swung, guessed] = PitchEvent.outcome_priors(
+                swung, batter_mod, pitcher_mod
+            )._asdict()
+    return ChainModel(
+        swing=_prob(swing_sampler, True),
+        guess=guess,
+        pitch=pitch,
+        contact=_normed(PitchEvent.contact_priors),
+        hit=_normed(PitchEvent.hit_priors),
+        oop=_normed(PitchEvent.oop_priors),
+        catch=_normed(CatchEvent.priors)['yes'],
+        throw=_normed(ThrowEvent.priors)['good'],
+        tag=_normed(TagEvent.priors)['out'],
+        leadoff=_prob(leadoff_sampler, True),
+        steal=_prob(steal_sampler, True),
+        pickoff=_prob(pickoff_sampler, 'y')
+    )
+
+def state_index(balls, strikes, outs, bases):
+    """Returns the chain index of a (count, outs, bases) state."""
+    return base_out_index(outs, bases) * N_COUNTS + count_index(balls, strikes)
+
+def index_state(index):
+    """Returns (balls, strikes, outs, bases) of a chain index."""
+    base_out, count = divmod(index, N_COUNTS)
+    outs, bases = divmod(base_out, 8)
+    balls, strikes = divmod(count, 3)
+    return balls, strikes, outs, bases
+
+"""Runner movement on the base mask"""
+def _move(bases, *moves, third=1):
+    """Applies (from_base, to_base) moves in order, like a run of
+    BaseBallGame.action_move calls.  Runners that are not on from_base
+    are skipped (from_base 0 is the batter).  A runner scoring from
+    third counts third runs.
+
+    Returns (bases, runs)
+    """
+    runs = 0
+    for from_base, to_base in moves:
+        if from_base:
+            if not bases & _base_bit[from_base]:
+                continue
+            bases &= ~_base_bit[from_base]
+        if to_base >= 4:
+            runs += third if from_base == 3 else 1
+        else:
+            bases |= _base_bit[to_base]
+    return bases, runs
+
+def _hit(bases, n, third=1):
+    """play_hit: runners take n bases, at least, and the batter n."""
+    return _move(bases, (3, 4), (2, min(4, n + 2)), (1, min(4, n + 1)), (0, n),
+                 third=third)
+
+def _forced(bases, batter=True, third=1):
+    """Runners advance only if forced (walks and wild pitches)."""
+    moves = []
+    if bases & 1:
+        if bases & 2:
+            if bases & 4:
+                moves.append((3, 4))
+            moves.append((2, 3))
+        moves.append((1, 2))
+    if batter:
+        moves.append((0, 1))
+    return _move(bases, *moves, third=third)
+
+def _advance(bases, batter=False, third=1):
+    """Every runner advances one base (balks and hit batters)."""
+    moves = [(3, 4), (2, 3), (1, 2)]
+    if batter:
+        moves.append((0, 1))
+    return _move(bases, *moves, third=third)
+
+def pickoff_targets(bases, model):
+    """Returns [(base, prob)], the chance that the pitcher tries to
+    pick off the runner on each base, as in
+    BaseBallPlayer.make_decision('pick-off', ...).
+
+    The lead runner on first (or on second, if first is empty) is the
+    target if leading off, otherwise the runner on third is.
+    """
+    lead = model.leadoff
+    targets = []
+    lower = 1 if bases & 1 else (2 if bases & 2 else 0)
+    if lower:
+        targets.append((lower, model.pickoff * lead))
+    if bases & 4:
+        p_third = model.pickoff * lead * (1 - lead if lower else 1)
+        targets.append((3, p_third))
+    return targets
+
+def steal_outcomes(bases, model, engine=False):
+    """Returns [(prob, bases, outs, runs)], the result of the catcher
+    catching a pitch while runners may be stealing.
+
+    The runner on third steals home (tagged by the catcher), otherwise
+    the runner on second, otherwise the runner on first, steals.
+    With engine, home steals count as in BaseBallGame (two runs, or
+    two outs).
+    """
+    catch = model.catch
+    steal = model.steal
+    scale = 2 if engine else 1
+    results = []
+    p_none = 1.
+    p_rest = 1.
+    if bases & 4:
+        p = catch * steal
+        new_bases = bases & ~4
+        results.append((p * (1 - model.tag), new_bases, 0, scale))
+        results.append((p * model.tag, new_bases, scale, 0))
+        p_none -= p
+        p_rest = 1 - steal
+    if bases & 2:
+        p = catch * p_rest * steal
+        results.append((p, (bases & ~2) | 4, 0, 0))
+        p_none -= p
+        p_rest *= 1 - steal
+    if bases & 1:
+        p = catch * p_rest * steal
+        results.append((p, (bases & ~1) | 2, 0, 0))
+        p_none -= p
+    results.append((p_none, bases, 0, 0))
+    return results
+
+def pitch_transitions(balls, strikes, outs, bases, model, engine=False,
+                      done=False):
+    """Returns the transitions out of a chain state, for one pitch
+    (or pick-off attempt).
+
+    Paramaters:
+    ==========
+    balls, strikes, outs, bases : int
+    model : ChainModel
+    engine : Boolean (default: False)
+
+    - if True, plays are counted as BaseBallGame counts them: a runner
+      scoring from third is two runs, a tag out is two outs (and a
+      runner picked off stays on base), an uncaught foul is two
+      fouls, the batter stays off base after a wild ball four, and
+      runners steal after a third strike out.  The absorbing state
+      then keeps the runners left on base.
+
+    done : Boolean (default: False)
+
+    - if True, every transition has a seventh field, True if the
+      plate appearance is over.
+
+    Returns a list of (prob, balls, strikes, outs, bases, runs); outs
+    is 3 for the absorbing state.
+    """
+    transitions = []
+    third = 2 if engine else 1
+    tag_outs = 2 if engine else 1
+
+    def emit(p, b, s, o, m, runs=0, over=False):
+        if p > 0:
+            if o >= 3:
+                b, s, o = 0, 0, 3
+                m = m if engine else 0
+            if done:
+                transitions.append((p, b, s, o, m, runs, over))
+            else:
+                transitions.append((p, b, s, o, m, runs))
+
+    def caught_pitch(p, b, s, o, m, over=False):
+        """catcher_catch_pitch: steals, if the batter is still up"""
+        if o >= 3 and not engine:
+            emit(p, b, s, o, m, over=over)
+            return
+        for q, m2, o2, runs in steal_outcomes(m, model, engine):
+            emit(p * q, b, s, o + o2, m2, runs, over)
+
+    p_pitch = 1.
+    for base, p_try in pickoff_targets(bases, model):
+        p_out = p_try * model.throw * model.catch * model.tag
+        if engine:
+            emit(p_out, balls, strikes, outs + tag_outs, bases)
+        else:
+            emit(p_out, balls, strikes, outs + 1, bases & ~_base_bit[base])
+        emit(p_try - p_out, balls, strikes, outs, bases)
+        p_pitch -= p_try
+
+    contact = model.contact
+    catch = model.catch
+    for swung, p_swing in ((True, model.swing), (False, 1 - model.swing)):
+        for guessed, p_guess in ((True, model.guess), (False, 1 - model.guess)):
+            priors = model.pitch[swung, guessed]
+            w = p_pitch * p_swing * p_guess
+
+            """strike, or strikeout"""
+            p = w * priors['strike']
+            if strikes >= 2:
+                caught_pitch(p, 0, 0, outs + 1, bases, True)
+            else:
+                caught_pitch(p, balls, strikes + 1, outs, bases)
+
+            """ball, or walk; wild pitch; hit by pitch; balk"""
+            p = w * priors['ball']
+            if balls >= 3:
+                emit(p, 0, 0, outs, *_forced(bases, third=third), True)
+            else:
+                caught_pitch(p, balls + 1, strikes, outs, bases)
+            p = w * priors['wild']
+            if balls >= 3:
+                emit(p, 0, 0, outs,
+                     *_forced(bases, not engine, third=third), True)
+            else:
+                emit(p, balls + 1, strikes, outs,
+                     *_forced(bases, False, third=third))
+            emit(w * priors['hbp'], 0, 0, outs,
+                 *_advance(bases, True, third=third), True)
+            emit(w * priors['balk'], balls, strikes, outs,
+                 *_advance(bases, third=third))
+
+            """contact: caught balls are outs"""
+            w_contact = w * priors['contact']
+            p = w_contact * contact['hit']
+            emit(p * catch, 0, 0, outs + 1, bases, 0, True)
+            for result, q in model.hit.items():
+                emit(p * (1 - catch) * q, 0, 0, outs,
+                     *_hit(bases, hit_bases[result], third), True)
+            p = w_contact * contact['oop']
+            emit(p * model.oop['gdb'], 0, 0, outs,
+                 *_move(bases, (3, 4), (2, 4), (1, 3), (0, 2), third=third),
+                 True)
+            emit(p * model.oop['hr'], 0, 0, outs,
+                 *_hit(bases, 4, third), True)
+            p = w_contact * contact['bunt']
+            emit(p * catch, 0, 0, outs + 1, bases, 0, True)
+            emit(p * (1 - catch), 0, 0, outs, *_hit(bases, 1, third), True)
+            p = w_contact * contact['foul']
+            emit(p * catch, 0, 0, outs + 1, bases, 0, True)
+            emit(p * (1 - catch), balls,
+                 min(2, strikes + (2 if engine else 1)), outs, bases)
+    return transitions
+
+def transition_matrices(model=None):
+    """Builds the transition matrices of the half-inning chain.
+
+    Returns (Q, A):
+
+    - Q : array (MAX_RUNS_PER_PITCH+1, N_STATES, N_STATES),
+          Q[r, i, j] is the chance of moving from state i to state j
+          while r runs score.
+    - A : array (MAX_RUNS_PER_PITCH+1, N_STATES),
+          A[r, i] is the chance of the third out from state i, with r
+          runs scoring on the play.
+    """
+    model = event_model() if model is None else model
+    Q = np.zeros((MAX_RUNS_PER_PITCH + 1, N_STATES, N_STATES))
+    A = np.zeros((MAX_RUNS_PER_PITCH + 1, N_STATES))
+    for i in range(N_STATES):
+        for p, b, s, o, m, runs in pitch_transitions(*index_state(i), model):
+            if o >= 3:
+                A[runs, i] += p
+            else:
+                Q[runs, i, state_index(b, s, o, m)] += p
+    return Q, A
+
+def plate_appearance_distribution(model=None, engine=True, max_runs=12):
+    """Returns the distribution of plate appearance results, from
+    every chain state.
+
+    Paramaters:
+    ==========
+    model : ChainModel (default: event_model())
+    engine : Boolean (default: True), see pitch_transitions
+    max_runs : int (default: 12)
+
+    Returns an array (N_STATES, 4, 8, max_runs+1): entry [i, o, m, r]
+    is the chance that the plate appearance under way in state i ends
+    with o outs (3 ends the half inning), the runners m on base and r
+    runs scored.  Longer run counts are vanishingly rare, and are
+    dropped (rows are renormalised).
+    """
+    model = event_model() if model is None else model
+    n_runs = MAX_RUNS_PER_PITCH + 2
+    P = np.zeros((n_runs, N_STATES, N_STATES))
+    D = np.zeros((n_runs, N_STATES, 32))
+    for i in range(N_STATES):
+        for p, b, s, o, m, runs, over in pitch_transitions(
+                *index_state(i), model, engine=engine, done=True):
+            if over or o >= 3:
+                D[runs, i, o * 8 + m] += p
+            else:
+                P[runs, i, state_index(b, s, o, m)] += p
+    f = _absorbed_runs(P, D, max_runs)
+    dist = f.transpose(1, 2, 0).reshape(N_STATES, 4, 8, max_runs + 1)
+    return dist / dist.sum(axis=(1, 2, 3), keepdims=True)
+
+def half_inning_end_distribution(model=None, engine=True, max_runs=20):
+    """Returns the distribution of the rest of the half inning, from
+    every chain state: the runs scored and the runners left on base.
+
+    Paramaters:
+    ==========
+    model : ChainModel (default: event_model())
+    engine : Boolean (default: True), see pitch_transitions
+
+    - with engine=False, the half inning always ends with the bases
+      empty.
+
+    max_runs : int (default: 20)
+
+    Returns an array (N_STATES, 8, max_runs+1): entry [i, m, r] is the
+    chance that the half inning under way in state i ends with the
+    runners m left on base and r runs scored.  Longer run counts are
+    dropped (rows are renormalised), as in plate_appearance_distribution.
+    """
+    model = event_model() if model is None else model
+    n_runs = MAX_RUNS_PER_PITCH + 2
+    P = np.zeros((n_runs, N_STATES, N_STATES))
+    D = np.zeros((n_runs, N_STATES, 8))
+    for i in range(N_STATES):
+        for p, b, s, o, m, runs in pitch_transitions(
+                *index_state(i), model, engine=engine):
+            if o >= 3:
+                D[runs, i, m] += p
+            else:
+                P[runs, i, state_index(b, s, o, m)] += p
+    dist = _absorbed_runs(P, D, max_runs).transpose(1, 2, 0)
+    return dist / dist.sum(axis=(1, 2), keepdims=True)
+
+def _absorbed_runs(P, D, max_runs):
+    """Solves for the chance of each way out of the chain, by the runs
+    scored on the way.
+
+    P : array (n_runs, N_STATES, N_STATES), transitions by runs scored
+    D : array (n_runs, N_STATES, width), exits by runs scored
+
+    Returns an array (max_runs+1, N_STATES, width).
+    """
+    n_runs, _, width = D.shape
+    """f_k = P_0 f_k + sum_r P_r f_(k-r) + D_k, as in run_distribution"""
+    scoreless = np.linalg.inv(np.eye(N_STATES) - P[0])
+    f = np.zeros((max_runs + 1, N_STATES, width))
+    for k in range(max_runs + 1):
+        rhs = D[k].copy() if k < n_runs else np.zeros((N_STATES, width))
+        for r in range(1, min(k, n_runs - 1) + 1):
+            rhs += P[r] @ f[k - r]
+        f[k] = scoreless @ rhs
+    return np.clip(f, 0, None)
+
+class HalfInningChain(object):
+    """Exact run expectancy and run distributions for a half inning.
+
+    Paramaters:
+    ==========
+    model : ChainModel (default: event_model())
+    """
+    def __init__(self, model=None):
+        self.model = event_model() if model is None else model
+        self.Q, self.A = transition_matrices(self.model)
+        identity = np.eye(N_STATES)
+        """Expected visits to each state before the next run scores"""
+        self._scoreless = np.linalg.inv(identity - self.Q[0])
+        self._fundamental = np.linalg.inv(identity - self.Q.sum(axis=0))
+        self._distribution = None
+
+    def expected_runs(self):
+        """Returns the expected runs to the end of the half inning,
+        from every chain state (array of shape (N_STATES,)).
+        """
+        runs = np.arange(MAX_RUNS_PER_PITCH + 1)
+        per_pitch = np.einsum('r,rij->i', runs, self.Q) + runs @ self.A
+        return self._fundamental @ per_pitch
+
+    def re24(self):
+        """Returns the run expectancy table, array (3 outs, 8 bases),
+        at the start of a plate appearance (0-0 count).
+        """
+        start = [state_index(0, 0, o, m) for o in range(3) for m in range(8)]
+        return self.expected_runs()[start].reshape(3, 8)
+
+    def run_distribution(self, max_runs=20):
+        """Returns the distribution of runs to the end of the half
+        inning, from every chain state.
+
+        Returns an array (N_STATES, max_runs+1): column k is the chance
+        of exactly k more runs, and the last column is the chance of
+        max_runs or more.
+        """
+        if self._distribution is not None \
+           and self._distribution.shape[1] > max_runs:
+            dist = self._distribution[:, :max_runs + 1].copy()
+            dist[:, -1] = 1 - dist[:, :-1].sum(axis=1)
+            return dist
+        """f_k = Q_0 f_k + sum_r Q_r f_(k-r) + A_k"""
+        f = np.zeros((max_runs, N_STATES))
+        for k in range(max_runs):
+            rhs = np.zeros(N_STATES)
+            if k <= MAX_RUNS_PER_PITCH:
+                rhs += self.A[k]
+            for r in range(1, min(k, MAX_RUNS_PER_PITCH) + 1):
+                rhs += self.Q[r] @ f[k - r]
+            f[k] = self._scoreless @ rhs
+        dist = np.empty((N_STATES, max_runs + 1))
+        dist[:, :-1] = f.T
+        dist[:, -1] = np.clip(1 - f.sum(axis=0), 0, 1)
+        self._distribution = dist
+        return dist.copy()
+
+    def half_inning_distribution(self, outs=0, bases=0,
+                                 balls=0, strikes=0, max_runs=20):
+        """Returns the run distribution of the rest of a half inning
+        (array of max_runs+1, the last entry is max_runs or more).
+        """
+        i = state_index(balls, strikes, outs, bases)
+        return self.run_distribution(max_runs)[i]
+
+
+if __name__ == '__main__':
+    chain = HalfInningChain()
+    np.set_printoptions(precision=3, suppress=True)
+    print('RE24 (rows: outs, columns: bases mask)')
+    print(chain.re24())
+    print('Half inning runs (0, 1, 2, ...)')
+    print(chain.half_inning_distribution(max_runs=8))
@@ -27,11 +27,15 @@ along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
 from collections import defaultdict, ChainMap, namedtuple
 import logging
 
-logging.basicConfig(level=logging.INFO)
+"""Debug messages go to this module's logger: logging is configured by
+the applications (e.g. game.py), not at import."""
+logger = logging.getLogger(__name__)
 
 __empty__ = '<missing>'
 
-ReferenceClass = namedtuple('ReferenceClass', ['state','environment'])
+ReferenceClass = namedtuple('ReferenceClass',
+                            ['state', 'environment', 'version'],
+                            defaults=(None,))
 Action = namedtuple('Action', ['action', 'subjects'])
 Outcome = namedtuple('Outcome', ['result', 'record', 'details'])
 
@@ -62,6 +66,7 @@ class CoreBayesEvent(ChainMap):
 
     - 'state' : namedtuple
     - 'environment' : NotImplemented (See game.py for an implementation.) 
+    - 'version' : optional, the version of a changing environment
     """    
     def __init__(self, action_class_context, reference_class_context):
         assert isinstance(action_class_context, dict)
@@ -71,8 +76,76 @@ class CoreBayesEvent(ChainMap):
             {'action': Action(**action_class_context)},
             {'outcome': __empty__}
         )
-class _BayesAction(CoreBayesEvent):
+
+"""Mapping keys of an event, and the SlotBayesEvent slots holding them"""
+event_keys = dict(referenceclass='_ref_class', action='_action',
+                  outcome='_outcome')
+
+class SlotBayesEvent(object):
+    """SlotBayesEvent is a lightweight replacement for CoreBayesEvent.
+
+    It holds the same three values as the mappings of a
+    CoreBayesEvent: the ReferenceClass, the Action, and the outcome
+    (initially __empty__), but in slots, with no dicts at all.
+
+    The mapping interface of CoreBayesEvent is kept for the keys
+    'referenceclass', 'action' and 'outcome', so event['outcome'] = ...
+    and event.get('action') work as before. Use as_chainmap for an
+    actual ChainMap.
+
+    Paramaters:
+    ----------
+    Same as CoreBayesEvent.
+    """
+    __slots__ = ('_ref_class', '_action', '_outcome')
+
+    def __init__(self, action_class_context, reference_class_context):
+        assert isinstance(action_class_context, dict)
+        assert isinstance(reference_class_context, dict)
+        self._ref_class = ReferenceClass(**reference_class_context)
+        self._action = Action(**action_class_context)
+        self._outcome = __empty__
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, event_keys[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, event_keys[key], value)
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        slot = event_keys.get(key)
+        return default if slot is None else getattr(self, slot)
+
+    def __contains__(self, key):
+        return key in event_keys
+
+    def __iter__(self):
+        return iter(event_keys)
+
+    def __len__(self):
+        return len(event_keys)
+
+    def keys(self):
+        return event_keys.keys()
+
+    def as_chainmap(self):
+        """Returns the event as a ChainMap, shaped like a CoreBayesEvent."""
+        return ChainMap(
+            {'referenceclass': self._ref_class},
+            {'action': self._action},
+            {'outcome': self._outcome}
+        )
+
+class _BayesAction(SlotBayesEvent):
     """Template for Core Bayes Event"""
+    __slots__ = ('_happened',)
+
     def __init__(self, action_context, reference_context):
         self._happened = False
         super().__init__(action_context, reference_context)
@@ -80,42 +153,43 @@ class _BayesAction(CoreBayesEvent):
     @property
     def action(self):
         """Returns the Action namedtuple for the current event."""
-        return self.get('action')
+        return self._action
 
     @property
     def outcome(self):
         """Returns the Outcome namedtuple for the current event."""
-        return self.get('outcome')
+        return self._outcome
 
     @property
     def ref_class(self):
         """Returns the ReferenceClass namedtuple
         for the current event.
         """
-        return self.get('referenceclass')
+        return self._ref_class
 
     @property
     def result(self):
         """Returns the result of the Outcome
         namedtuple for the current event.
         """
-        if isinstance(self.outcome, str):
-            raise ValueError('Bad outcome "{}"!'.format(self.outcome))
-        return self.outcome.result
+        outcome = self._outcome
+        if isinstance(outcome, str):
+            raise ValueError('Bad outcome "{}"!'.format(outcome))
+        return outcome.result
 
     @property
     def record(self):
         """Returns the record of the Outcome
         namedtuple for the current event.
         """
-        return self.outcome.record
+        return self._outcome.record
 
     @property
     def details(self):
         """Returns the details of the Outcome
         namedtuple for the current event.
         """
-        return self.outcome.details
+        return self._outcome.details
 
     @property
     def happened(self):
@@ -144,7 +218,12 @@ class _BayesAction(CoreBayesEvent):
         return dict([('action', action), ('subjects', subjects)])
 
     def _build_game_context(self, state=None, environment=None):
-        return dict([('state', state), ('environment', environment)])
+        """A versioned environment (e.g. a game.PlayEnvironment) keeps
+        changing: its version is pinned, and kept with the event."""
+        pin = getattr(environment, 'pin', None)
+        version = None if pin is None else pin()
+        return dict([('state', state), ('environment', environment),
+                     ('version', version)])
 
     def __repr__(self):
         return ('-bayes {} ({})\n--{}\n--A: <action: {}> <subjects: {}>\n'\
@@ -170,13 +249,15 @@ class BayesAction(_BayesAction):
     The developer can also manually set self.debug as True or False,
     depending on whether they want to see debugging information. 
     """
+    __slots__ = ('start_time', 'debug')
+
     def __init__(self, action, ref_class, time=None, *subjects):
         self.start_time = time
         self.debug = False
         super().__init__(action, ref_class)
 
         if self.debug:
-            logging.info('Entering event {}'.format(self.name))
+            logger.info('Entering event {}'.format(self.name))
 
         self.random_triggers() # I current don't take advantage of this
         self.upkeep()
@@ -191,13 +272,13 @@ class BayesAction(_BayesAction):
         are added to the current Outcome mapping of the current event.
         """
         if self.debug:
-            logging.info('Current outcome: {}'.format(self.outcome))
+            logger.info('Current outcome: {}'.format(self.outcome))
 
         self._happened = True
         self._perform_action()
 
         if self.debug:
-            logging.info('Exiting event {}'.format(self.name))
+            logger.info('Exiting event {}'.format(self.name))
 
     def isaction(self, *classnames):
         """Returns True if all the classnames, which are strings
@@ -27,12 +27,9 @@ along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
 from collections import namedtuple, defaultdict
 import numpy as np
 from functools import partial
-from scipy.stats import vonmises_line
 from numbers import Number
 import context as con
-from scipy.stats import truncnorm
-
-choice = np.random.choice
+from helpers import as_stream, AliasSampler
 
 SCALE = 10
 attribute_default = 1
@@ -47,6 +44,114 @@ AttributeBundle = namedtuple('AttributeBundle',
 QualityBundle = namedtuple('QualityBundle',
                            ['accuracy', 'precision', 'flexibility'])
 
+"""Precompiled samplers for player decisions"""
+check_sampler = AliasSampler((False, True), (.99, .01))
+swing_sampler = AliasSampler((True, False), (.7, .3))
+leadoff_sampler = AliasSampler((True, False), (.4, .6))
+steal_sampler = AliasSampler((True, False), (.5, .5))
+pickoff_sampler = AliasSampler(('y', 'n'), (.05, .95))
+
+""" Pitching/Hitting Type Locations """
+action_locations = {
+    'pitch': (('strike', con.strikes), ('ball', con.balls)),
+    'hit': (('swing', con.hits),)
+}
+
+
+"""League wide player table.
+
+The attributes of BaseBallPlayers are stored in a PlayerTable, one
+NumPy column per attribute and one row per player, and the players are
+thin views of their rows.  Batched models can read a column for many
+players at once, e.g. table.strength[rows].
+"""
+player_columns = (
+    ('num', np.int16),
+    ('pos', np.int8),
+    ('team', object),
+    ('strength', np.float64),
+    ('movement', np.float64),
+    ('fatigue', np.float64),
+    ('swung', bool),
+    ('leadoff', bool),
+    ('steal', bool),
+    ('pick_off', bool),
+    ('pickoff_location', object),
+    ('onbase', np.int8)
+)
+
+class PlayerTable(object):
+    """Structure of arrays of player attributes.
+
+    Paramaters:
+    ==========
+    capacity : int (default: 64), initial number of rows
+
+    Attributes:
+    ==========
+    One array per column in player_columns (e.g. table.strength), and
+    pitch_types, an array (rows, len(context.pitch_types)) of the
+    indices in context.pitch_types of each player's pitch types, in
+    the player's order, padded with -1.  players is the list of the
+    player views, by row.  Arrays grow by doubling, so only their first
+    len(table) rows are in use.
+    """
+    def __init__(self, capacity=64):
+        capacity = max(1, capacity)
+        for name, dtype in player_columns:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.pitch_types = np.full((capacity, len(con.pitch_types)), -1,
+                                   dtype=np.int8)
+        self.players = []
+
+    def __len__(self):
+        return len(self.players)
+
+    def add_row(self, player):
+        """Adds a row for the player view, and returns it."""
+        row = self.add_rows(1)
+        self.players[row] = player
+        return row
+
+    def add_rows(self, n):
+        """Adds n rows, without player views yet, and returns the first."""
+        first = len(self.players)
+        while first + n > len(self.num):
+            for name, _ in player_columns:
+                column = getattr(self, name)
+                setattr(self, name,
+                        np.concatenate((column, np.zeros_like(column))))
+            self.pitch_types = np.concatenate(
+                (self.pitch_types, np.full_like(self.pitch_types, -1))
+            )
+        self.players.extend([None] * n)
+        return first
+
+    def column(self, name, rows=None):
+        """Returns the rows in use of a column (or the given rows)."""
+        column = getattr(self, name)[:len(self)]
+        return column if rows is None else column[rows]
+
+    def pitch_type_masks(self, rows=None):
+        """Returns the pitch types of players as bit masks: bit k is
+        set if the player throws context.pitch_types[k].
+        """
+        types = self.column('pitch_types', rows)
+        bits = np.where(types >= 0, 1 << types.astype(np.int64), 0)
+        return np.bitwise_or.reduce(bits, axis=-1)
+
+"""The table of players built without one, shared so that each player
+is not a table of its own.  It grows like any other PlayerTable."""
+default_table = PlayerTable()
+
+def _table_column(name):
+    """A BaseBallPlayer property: the player's row of a table column."""
+    def fget(self):
+        return getattr(self._table, name).item(self._row)
+
+    def fset(self, value):
+        getattr(self._table, name)[self._row] = value
+    return property(fget, fset)
 
 def pos_from_str(pos_name):
     assert pos_name in Positions
@@ -137,37 +242,123 @@ class BayesPlayer(Player):
             return qual
             
 class BaseBallPlayer(BayesPlayer):
+    """A baseball player: a view of its row of a PlayerTable.
+
+    table : PlayerTable (default: None, i.e. player.default_table)
+    """
     def __init__(self, num, pos, team,
                  stren, move, fatig,
                  hit_types=con.hit_types,
-                 pitch_types=con.pitch_types):
-        
+                 pitch_types=con.pitch_types,
+                 rng=None, table=None):
+        self._table = default_table if table is None else table
+        self._row = self._table.add_row(self)
         super().__init__(num, pos, team, stren, move, fatig)
-        self._swung = False
-        self._leadoff = False
-        self._steal = False
-        self._pick_off = False
+        """A new row's swung, leadoff, steal and pick_off are already
+        False, and its pitch types are drawn below."""
         self._pickoff_location = None
         self._onbase = -1 # 1, 2, 3        
         self._hit_types = hit_types
-        self._pitch_types = pitch_types
 
         """The player's pitch possibilities, randomly selected.
         Pitch Type Names, of length k, where 0 < k <= K (== len(PT))
         taken from a random permutation of pitch types.
         """
-        pos_k = choice(range(1, len(con.pitch_types)+1))
+        rng = as_stream(rng)
+        pos_k = rng.choice(range(1, len(con.pitch_types)+1))
         self._pitch_types = list(
-                np.random.permutation(con.pitch_types)[:pos_k]
+                rng.permutation(con.pitch_types)[:pos_k]
         )
 
+    table_cls = PlayerTable
+
+    @classmethod
+    def from_row(cls, table, row, hit_types=con.hit_types):
+        """Returns a view of a row already filled in (e.g. by
+        helpers.populate_random_league), without drawing its pitch types.
+        """
+        player = cls.__new__(cls)
+        player._table = table
+        player._row = row
+        table.players[row] = player
+        player._learnability = NotImplemented
+        player._risk = NotImplemented
+        player.qualities = defaultdict(QualityBundle)
+        player._hit_types = hit_types
+        return player
+
+    """Attributes stored in the player's PlayerTable row"""
+    _num = _table_column('num')
+    _pos = _table_column('pos')
+    _team = _table_column('team')
+    _swung = _table_column('swung')
+    _leadoff = _table_column('leadoff')
+    _steal = _table_column('steal')
+    _pick_off = _table_column('pick_off')
+    _pickoff_location = _table_column('pickoff_location')
+    _onbase = _table_column('onbase')
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def attributes(self):
+        return AttributeBundle(strength=self.stren, movement=self.move,
+                               fatigue=self.fatig)
+
+    @attributes.setter
+    def attributes(self, bundle):
+        table, row = self._table, self._row
+        table.strength[row] = bundle.strength
+        table.movement[row] = bundle.movement
+        table.fatigue[row] = bundle.fatigue
+
+    stren = _table_column('strength')
+    move = _table_column('movement')
+    fatig = _table_column('fatigue')
+
+    @property
+    def _pitch_types(self):
+        types = self._table.pitch_types[self._row]
+        return [con.pitch_types[k] for k in types.tolist() if k >= 0]
+
+    @_pitch_types.setter
+    def _pitch_types(self, names):
+        types = self._table.pitch_types[self._row]
+        types[:] = -1
+        types[:len(names)] = [con.pitch_types.index(n) for n in names]
+
+    @property
+    def pitch_types(self):
+        """The names of the player's pitch types, read from the table."""
+        return self._pitch_types
+
+    """Per game player attributes, saved in game snapshots"""
+    game_state_fields = ('_pos', '_swung', '_leadoff', '_steal',
+                         '_pick_off', '_pickoff_location', '_onbase')
+
+    @property
+    def game_state(self):
+        """Returns the per game player attributes, as a tuple."""
+        return tuple(getattr(self, f) for f in self.game_state_fields)
+
+    def set_game_state(self, state):
+        """Restores attributes returned by BaseBallPlayer.game_state."""
+        for field, value in zip(self.game_state_fields, state):
+            setattr(self, field, value)
+
     """Return True if a player is injured"""
-    def injury_check(self):
-        return choice([False, True], p=[.99, .01])
+    def injury_check(self, rng=None):
+        return as_stream(rng).categorical(check_sampler)
 
     """Return True if a player commits an error."""
-    def error_check(self):
-        return choice([False, True], p=[.99, .01])
+    def error_check(self, rng=None):
+        return as_stream(rng).categorical(check_sampler)
         
     @property
     def swung(self):
@@ -197,23 +388,22 @@ class BaseBallPlayer(BayesPlayer):
         self._pick_off = False
         self._pickoff_location = None
 
-    def make_decision(self, action_type_name, *args):
-        sample = choice
+    def make_decision(self, action_type_name, *args, rng=None):
+        rng = as_stream(rng)
+        sample = rng.categorical
         if action_type_name == 'steal':
-            self._steal = sample([True, False])
-            if self._steal:
-                self._leadoff
+            self._steal = sample(steal_sampler)
             return
         elif action_type_name == 'swing':
-            self._swung = sample([True, False], p=[.7, .3])
+            self._swung = sample(swing_sampler)
         elif action_type_name == 'leadoff':
-            self._leadoff = sample([True, False], p=[.4, .6])
+            self._leadoff = sample(leadoff_sampler)
             return
         elif action_type_name == 'pick-off':
             if not args:
                 self._pick_off = False
                 return
-            decision = sample(['y', 'n'], p=[.05, .95])
+            decision = sample(pickoff_sampler)
             if decision == 'n':
                 self._pick_off = False
                 return
@@ -256,29 +446,16 @@ class BaseBallPlayer(BayesPlayer):
 
             - 'pitch' and 'hit' player decisions.
             """
-            action_type = dict(
-                [('pitch', self._pitch_types),
-                 ('hit', con.hit_types)]
-            )
-            """ Pitching Type Locations """
-            action_loc = {
-                'pitch': {
-                    'strike': con.strikes,
-                    'ball': con.balls
-                },
-                'hit': {
-                    'swing': con.hits
-                }
-            }        
-            action_expected_type = sample(action_type.get(action_type_name))
-            possible_location_actions = action_loc.get(action_type_name)
-            sub_action_names = list(possible_location_actions.keys())
-            sub_action = sample(sub_action_names)
-            sub_actions = possible_location_actions[sub_action]
-            action_pos = sample(
-                range(len(sub_actions))
-            )
+            if action_type_name == 'pitch':
+                """A caller making several pitch decisions can read the
+                pitch types once, and pass them in args[0]."""
+                action_types = args[0] if args else self._pitch_types
+            else:
+                action_types = con.hit_types
+            action_expected_type = rng.pick(action_types)
+            possible_location_actions = action_locations[action_type_name]
+            sub_action, sub_actions = rng.pick(possible_location_actions)
             """ Return the expected type, location 
             E.g. : 'fastball', ('up', 'away')
             """
-            return action_expected_type, sub_actions[action_pos]
\ No newline at end of file
+            return action_expected_type, rng.pick(sub_actions)
\ No newline at end of file
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+from functools import lru_cache
+import math
+
+from helpers import AliasSampler, counted_namedtuple, cond_dampen
+
+"""Compiled priors.
+
+A prior is a categorical distribution over event outcomes. Priors are
+compiled once: the labels and probabilities are validated, the Prior
+namedtuple (the form events expose as event.probs) is built, and so is
+the alias table used to draw from it.  Distributions derived from a
+compiled prior (e.g. by cond_dampen) are cached on it, keyed by the
+conditioning, so they are compiled only once too.
+"""
+
+@lru_cache(maxsize=None)
+def prior_type(labels):
+    """Returns the (cached) Prior namedtuple class for a tuple of labels."""
+    return counted_namedtuple('Prior', labels)
+
+class CompiledPrior(object):
+    """A validated prior distribution, with its sampler.
+
+    Paramaters:
+    ----------
+    labels : tuple of outcome names
+    probs : tuple of probabilities, one for each label (summing to 1)
+
+    Attributes:
+    ----------
+    prior : Prior namedtuple, e.g. Prior(yes=.6, miss=.3, drop=.1)
+    sampler : helpers.AliasSampler
+    """
+    __slots__ = ('labels', 'probs', 'prior', 'sampler', '_derived')
+
+    def __init__(self, labels, probs):
+        assert len(labels) == len(probs)
+        assert all(p >= 0 for p in probs)
+        assert math.isclose(sum(probs), 1, rel_tol=.0001)
+        self.labels = labels
+        self.probs = probs
+        self.prior = prior_type(labels)(*probs)
+        self.sampler = AliasSampler(labels, probs)
+        self._derived = {}
+
+    def asdict(self):
+        """Returns the prior as a dict of {label: prob}."""
+        return dict(zip(self.labels, self.probs))
+
+    def draw(self, rng):
+        """Returns an outcome drawn from a helpers.RandomStream."""
+        return self.sampler.draw(rng.random())
+
+    def dampen(self, sub, cond=0):
+        """Returns the (cached) prior conditioned with helpers.cond_dampen,
+        i.e. with the outcomes in sub given the probability cond.
+        """
+        key = ('dampen', tuple(sub), cond)
+        derived = self._derived.get(key)
+        if derived is None:
+            derived = compile_dict(cond_dampen(self.asdict(), sub, cond))
+            self._derived[key] = derived
+        return derived
+
+    def __repr__(self):
+        return 'CompiledPrior({!r})'.format(self.prior)
+
+@lru_cache(maxsize=4096)
+def compile_prior(labels, probs):
+    """Returns the (cached) CompiledPrior of the tuples labels, probs."""
+    return CompiledPrior(labels, probs)
+
+def compile_dict(probs):
+    """Returns the (cached) CompiledPrior of a dict {label: prob}."""
+    return compile_prior(tuple(probs), tuple(probs.values()))
+
+"""Registry of named priors"""
+prior_registry = {}
+
+def register_prior(name, probs):
+    """Compiles the dict probs, and registers it as the prior name.
+
+    Returns the CompiledPrior.
+    """
+    compiled = compile_dict(probs)
+    prior_registry[name] = compiled
+    return compiled
+
+def get_prior(name):
+    """Returns the registered CompiledPrior called name."""
+    return prior_registry[name]
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import os
+import numpy as np
+
+from logic import packed_field, inning_order
+from records import plate_appearance_records, record_names, record_types
+
+"""Indexed queries over event logs.
+
+An EventQuery indexes the columns of an eventlog.EventLog by the
+integer keys below.  Each index sorts the row numbers by key (a stable
+argsort, so rows stay in log order within a key) and keeps the offsets
+of every key value, so the rows with a key value are one slice:
+
+    rows of value v = order[offsets[v]:offsets[v+1]]
+
+Filters intersect those (sorted) row sets, smallest first, instead of
+scanning the log.  Indexes are built on first use and saved in the
+log directory (under index/), where later queries memory map them.
+
+Keys:
+
+- event : record type (see records.py), filtered by record name
+  prefixes like 'move.steal' or 'pitch.contact'
+- bases, outs, balls, strikes, half, inning : GameState fields of the
+  packed gamestate (before the record, by default), with inning the
+  whole inning number, and half 0 (top) or 1 (bottom)
+- actor, batter, pitcher : player numbers
+- game : game id
+"""
+
+state_keys = ('bases', 'outs', 'balls', 'strikes', 'half', 'inning')
+index_keys = ('event',) + state_keys + ('actor', 'batter', 'pitcher', 'game')
+
+"""Records that end a plate appearance (see records.py)"""
+plate_appearance_events = plate_appearance_records
+
+def event_types(events):
+    """Returns the sorted record types of a record name prefix, a
+    record type, or a list of them.
+    """
+    if isinstance(events, (str, int, np.integer)):
+        events = [events]
+    types = set()
+    for event in events:
+        if isinstance(event, str):
+            found = record_types(event)
+            if not found:
+                raise ValueError('Unknown record name {}'.format(event))
+            types |= found
+        else:
+            types.add(int(event))
+    return sorted(types)
+
+class ColumnIndex(object):
+    """Rows of a column, grouped by (non negative integer) key value.
+
+    Paramaters:
+    ==========
+    order : array of row numbers, sorted by key
+    offsets : array (n_values+1,), rows of value v are
+              order[offsets[v]:offsets[v+1]]
+    """
+    __slots__ = ('order', 'offsets')
+
+    def __init__(self, order, offsets):
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, keys, n_values=0):
+        """Builds the index of an array of keys."""
+        keys = np.asarray(keys, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        counts = np.bincount(keys, minlength=n_values)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(order, offsets)
+
+    @property
+    def n_values(self):
+        return len(self.offsets) - 1
+
+    def rows(self, value):
+        """Returns the (sorted) rows with key value."""
+        if not 0 <= value < self.n_values:
+            return self.order[:0]
+        return self.order[self.offsets[value]:self.offsets[value + 1]]
+
+    def rows_in(self, values):
+        """Returns the sorted rows with any of the key values."""
+        values = list(values)
+        if len(values) == 1:
+            return self.rows(values[0])
+        return np.sort(np.concatenate([self.rows(v) for v in values]))
+
+    def counts(self):
+        """Returns the number of rows with each key value."""
+        return np.diff(self.offsets)
+
+class EventQuery(object):
+    """Filters and group-by aggregates over an event log.
+
+    Paramaters:
+    ==========
+    log : eventlog.EventLog
+    state : 'pre' or 'post' (default: 'pre')
+
+    - the gamestates that the state keys are read from.
+
+    save : Boolean (default: True), save built indexes with the log
+
+    Usage:
+
+    >>> q = EventQuery(EventLog('season_log'))
+    >>> rows = q.rows(event=plate_appearance_events, second=1, outs=2)
+    >>> steals = q.rows(event='move.steal', actor=17)
+    >>> q.group_by(steals, 'game')
+    """
+    def __init__(self, log, state='pre', save=True):
+        assert state in ('pre', 'post')
+        self.log = log
+        self.state = state
+        self.save = save
+        self.n_rows = len(log)
+        self._columns = {}
+        self._indexes = {}
+
+    def column(self, name, rows=None):
+        """Returns a log column, or a key (see index_keys), for rows
+        (default: every row).
+        """
+        if name not in self._columns:
+            if name == 'event':
+                values = self.column('code') >> 24
+            elif name == 'inning':
+                values = packed_field(self.column(self.state), 'inning') // 2
+            elif name in state_keys:
+                values = packed_field(self.column(self.state), name)
+            else:
+                values = self.log[name]
+            self._columns[name] = values
+        values = self._columns[name]
+        return values if rows is None else values[rows]
+
+    def _index_path(self, key):
+        name = key if key not in state_keys else key + '-' + self.state
+        return os.path.join(self.log.path, 'index', name + '.{}.npy')
+
+    def index(self, key):
+        """Returns the ColumnIndex of a key (see index_keys)."""
+        assert key in index_keys
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        path = self._index_path(key)
+        if os.path.exists(path.format('order')):
+            order = np.load(path.format('order'), mmap_mode='r')
+            if len(order) == self.n_rows:
+                index = ColumnIndex(order, np.load(path.format('offsets')))
+        if index is None:
+            n_values = len(record_names) if key == 'event' else 0
+            index = ColumnIndex.build(self.column(key), n_values)
+            if self.save:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.save(path.format('order'), index.order)
+                np.save(path.format('offsets'), index.offsets)
+        self._indexes[key] = index
+        return index
+
+    def _filter_rows(self, key, value):
+        """Returns the sorted rows matching one filter."""
+        if key == 'event':
+            return self.index('event').rows_in(event_types(value))
+        if key in ('first', 'second', 'third'):
+            bit = 1 << ('first', 'second', 'third').index(key)
+            masks = [m for m in range(8) if bool(m & bit) == bool(value)]
+            return self.index('bases').rows_in(masks)
+        if key == 'order':
+            key, value = 'half', inning_order.index(value)
+        if key not in index_keys:
+            raise KeyError('Unknown query key {}'.format(key))
+        if isinstance(value, (list, tuple, set, frozenset, range)):
+            return self.index(key).rows_in(value)
+        return self.index(key).rows(value)
+
+    def rows(self, **filters):
+        """Returns the sorted rows matching every filter.
+
+        Filters are index keys (see index_keys), the Bases fields
+        first, second and third (0 or 1), and order ('top' or
+        'bottom'), each equal to a value or in a list of values.
+        """
+        if not filters:
+            return np.arange(self.n_rows)
+        matches = sorted((self._filter_rows(k, v) for k, v in filters.items()),
+                         key=len)
+        rows = matches[0]
+        for other in matches[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return np.asarray(rows)
+
+    def count(self, **filters):
+        """Returns the number of rows matching every filter."""
+        if len(filters) == 1:
+            (key, value), = filters.items()
+            if key in index_keys and not isinstance(
+                    value, (str, list, tuple, set, frozenset, range)):
+                index = self.index(key)
+                return int(index.counts()[value]) \
+                    if 0 <= value < index.n_values else 0
+        return len(self.rows(**filters))
+
+    def group_by(self, rows, key, column=None, how='count'):
+        """Groups rows by the values of key (a key or a log column).
+
+        Paramaters:
+        ==========
+        rows : array of rows (e.g. from EventQuery.rows)
+        key : str
+        column : str (default: None), the column aggregated
+        how : 'count', 'sum' or 'mean' (default: 'count')
+
+        Returns a dict {key value: aggregate}.
+        """
+        keys = self.column(key, rows)
+        values, inverse, counts = np.unique(
+            keys, return_inverse=True, return_counts=True
+        )
+        if how == 'count':
+            result = counts
+        else:
+            assert column is not None
+            totals = np.bincount(inverse, weights=self.column(column, rows),
+                                 minlength=len(values))
+            if how == 'sum':
+                result = totals
+            elif how == 'mean':
+                result = totals / counts
+            else:
+                raise ValueError('Unknown aggregate {}'.format(how))
+        return dict(zip(values.tolist(), result.tolist()))
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import re
+import numpy as np
+from context import outcome_records, game_records
+
+"""Integer event codes.
+
+Every record in context.outcome_records (and context.game_records) is a
+*record type*, named by its path in the nested dicts, e.g.
+'pitch.strike.look' ('Sc') or 'move.steal' ('{}:steal:{}').
+
+An event record is packed into a single 32 bit unsigned integer:
+
+    bits 24-31 : record type
+    bits 16-23 : first operand  (e.g. from base, fielder position)
+    bits  8-15 : second operand (e.g. to base, tagged player number)
+    bits  0-7  : actor, the number of the player doing the action
+                 (0 if there is none: player numbers start at 1)
+
+so event logs can be stored in NumPy arrays of dtype code_dtype.
+The record strings are only rendered when a code is displayed.
+"""
+
+code_dtype = np.uint32
+
+def _leaves(records, path):
+    for key, value in records.items():
+        if isinstance(value, dict):
+            yield from _leaves(value, path + (key,))
+        else:
+            yield '.'.join(path + (key,)), value
+
+record_names = []
+record_templates = []
+for _name, _template in _leaves(dict(outcome_records, game=game_records), ()):
+    record_names.append(_name)
+    record_templates.append(_template)
+
+record_arity = [t.count('{}') for t in record_templates]
+_type_index = dict((name, n) for n, name in enumerate(record_names))
+
+def record_type(name):
+    """Returns the record type (int) of a record name, like 'move.steal'."""
+    return _type_index[name]
+
+"""Prefix index: the record types under every prefix of every record
+name, e.g. 'pitch', 'pitch.contact' and 'pitch.contact.hit.single'.
+"""
+_prefix_index = {}
+for _n, _name in enumerate(record_names):
+    _parts = _name.split('.')
+    for _k in range(1, len(_parts) + 1):
+        _prefix_index.setdefault('.'.join(_parts[:_k]), set()).add(_n)
+_prefix_index = dict((_prefix, frozenset(_types))
+                     for _prefix, _types in _prefix_index.items())
+
+def record_types(prefix):
+    """Returns the frozenset of record types whose name starts with
+    prefix, e.g. record_types('pitch.strikeout').
+    """
+    return _prefix_index.get(prefix, frozenset())
+
+"""Records that end a plate appearance, by name prefix.  A bunt hit
+(pitch.contact.bunt) does not: the game keeps the batter at bat.  A
+caught bunt is a pitch.outs record, which does.
+"""
+plate_appearance_records = (
+    'pitch.walk', 'pitch.hbp', 'pitch.strikeout', 'pitch.outs',
+    'pitch.contact.hit', 'pitch.contact.oop', 'game.pa'
+)
+plate_appearance_types = frozenset().union(
+    *(record_types(prefix) for prefix in plate_appearance_records)
+)
+
+"""Record labels: the top level name of every record type, i.e. the
+action of context.outcome_records ('pitch', 'throw', 'catch', 'move',
+'tag' or 'shift') or 'game', for context.game_records.
+"""
+record_labels = tuple(name.split('.')[0] for name in record_names)
+
+def _record_tree(records, path):
+    tree = {}
+    for key, value in records.items():
+        if isinstance(value, dict):
+            tree[key] = _record_tree(value, path + (key,))
+        else:
+            tree[key] = _type_index['.'.join(path + (key,))]
+    return tree
+
+"""Nested dicts of record types, shaped like context.outcome_records."""
+record_tree = _record_tree(dict(outcome_records, game=game_records), ())
+
+class EventCode(int):
+    """An event record, packed into a fixed width integer.
+
+    An EventCode compares, hashes and stores like an int, but it is
+    displayed (str, format, repr) as its record string.
+    """
+    __slots__ = ()
+
+    @property
+    def rtype(self):
+        """Returns the record type of the event."""
+        return self >> 24
+
+    @property
+    def a(self):
+        """Returns the first operand of the event."""
+        return (self >> 16) & 0xff
+
+    @property
+    def b(self):
+        """Returns the second operand of the event."""
+        return (self >> 8) & 0xff
+
+    @property
+    def actor(self):
+        """Returns the number of the acting player (0 if none)."""
+        return self & 0xff
+
+    @property
+    def name(self):
+        """Returns the record name, like 'pitch.strike.look'."""
+        return record_names[self >> 24]
+
+    def __str__(self):
+        return render(self)
+
+    def __format__(self, spec):
+        return format(render(self), spec)
+
+    def __repr__(self):
+        return 'EventCode({!r})'.format(render(self))
+
+def encode(rtype, a=0, b=0, actor=0):
+    """Returns the EventCode for a record type and its operands.
+
+    Records with three operands in their string (e.g. 'TP:{}-{}-{}')
+    keep the third one in the actor byte.
+    """
+    return EventCode((rtype << 24) | (a << 16) | (b << 8) | actor)
+
+def render(code):
+    """Returns the record string of an event code."""
+    rtype = code >> 24
+    arity = record_arity[rtype]
+    if not arity:
+        return record_templates[rtype]
+    operands = ((code >> 16) & 0xff, (code >> 8) & 0xff, code & 0xff)
+    return record_templates[rtype].format(*operands[:arity])
+
+"""Parsing record strings (for old logs, and code written for strings)."""
+_literal_index = {}
+_skeleton_index = {}
+for _n, _template in enumerate(record_templates):
+    if record_arity[_n]:
+        _skeleton_index.setdefault(_template, _n)
+    else:
+        _literal_index.setdefault(_template, _n)
+
+_digits = re.compile(r'\d+')
+
+def parse_record(rec, strict=True):
+    """Returns the EventCode of a record string, like '1:move:3'.
+
+    If the record is unknown, raises a ValueError, or returns None
+    when strict is False.
+    """
+    rtype = _literal_index.get(rec)
+    if rtype is not None:
+        return encode(rtype)
+    rtype = _skeleton_index.get(_digits.sub('{}', rec))
+    if rtype is None:
+        if strict:
+            raise ValueError('Unknown record {}'.format(rec))
+        return None
+    operands = [int(x) for x in _digits.findall(rec)] + [0, 0, 0]
+    if record_arity[rtype] < 3:
+        return encode(rtype, operands[0], operands[1])
+    return encode(rtype, operands[0], operands[1], operands[2])
+
+def as_code(rec):
+    """Returns rec as an EventCode; rec can be an int or a record string."""
+    if isinstance(rec, EventCode):
+        return rec
+    if isinstance(rec, str):
+        return parse_record(rec)
+    return EventCode(rec)
+
+def record_label(rec):
+    """Returns the label of a record (an EventCode, int or record
+    string; see record_labels), or 'missing' for unknown records.
+    """
+    if isinstance(rec, str):
+        rec = parse_record(rec, strict=False)
+        if rec is None:
+            return 'missing'
+    return record_labels[rec >> 24]
+
+def code_fields(codes):
+    """Unpacks an array of event codes into arrays of its fields.
+
+    Returns a tuple of arrays: (rtype, a, b, actor)
+    """
+    codes = np.asarray(codes, dtype=code_dtype)
+    return (codes >> 24, (codes >> 16) & 0xff,
+            (codes >> 8) & 0xff, codes & 0xff)
+
+"""Number of bases for a base hit, by PitchEvent result."""
+hit_bases = dict(single=1, double=2, triple=3, four=4)
+
+
+if __name__ == '__main__':
+    for rec in ['Sc', 'Hit:3', '1:move:3', '12:tagout:7', 'FO:8', '<Out>']:
+        code = parse_record(rec)
+        print(rec, int(code), code.name, code)
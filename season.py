@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import os
+from collections import namedtuple, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Number
+
+from game import simulate_game
+from helpers import spawn_seeds
+from stats import StatsBook
+
+SeasonResult = namedtuple('SeasonResult',
+                          ['results', 'home_wins', 'away_wins', 'standings',
+                           'stats'])
+
+def _play(args):
+    """Worker function: plays one scheduled game."""
+    away_team, home_team, seed, keep_events, keep_stats, n = args
+    book = StatsBook() if keep_stats else None
+    result = simulate_game(away_team, home_team, seed,
+                           event_sink=book, game_id=n)
+    if not keep_events:
+        result = result._replace(events=None)
+    return result, book
+
+def simulate_season(schedule, seed=None, processes=None,
+                    chunksize=None, keep_events=False, keep_stats=False):
+    """Simulate a season (or tournament) of games over a process pool.
+
+    Paramaters:
+    ==========
+    schedule : int, or list of (away_team, home_team) pairs
+
+    - if schedule is an int N, N games between random rosters are played.
+
+    seed : int (default: None)
+
+    - the root seed. Every game gets its own SeedSequence, spawned from
+      the root seed by schedule position, so results are reproducible
+      for a given seed no matter how many processes are used.
+
+    processes : int (default: None, i.e. one per CPU)
+
+    - with processes == 1, games are played in the current process.
+
+    chunksize : int (default: None)
+    keep_events : Boolean (default: False)
+
+    - event logs are large, so they are dropped from the results unless
+      keep_events is True.
+
+    keep_stats : Boolean (default: False)
+
+    - if True, every game keeps a stats.StatsBook, and the books are
+      merged into the season totals, SeasonResult.stats.
+
+    Returns a SeasonResult, with the GameResults in schedule order.
+    """
+    if isinstance(schedule, Number):
+        schedule = [(None, None)] * int(schedule)
+    n = len(schedule)
+    seeds = spawn_seeds(seed, n)
+    tasks = [(away, home, s, keep_events, keep_stats, n)
+             for n, ((away, home), s) in enumerate(zip(schedule, seeds))]
+
+    processes = os.cpu_count() if processes is None else processes
+    if processes <= 1 or n <= 1:
+        results = list(map(_play, tasks))
+    else:
+        if chunksize is None:
+            chunksize = max(1, n // (4 * processes))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_play, tasks, chunksize=chunksize))
+    results, books = zip(*results) if results else ((), ())
+    results = list(results)
+    stats = None
+    if keep_stats:
+        stats = StatsBook()
+        for book in books:
+            stats.merge(book)
+
+    home_wins = 0
+    away_wins = 0
+    standings = defaultdict(lambda: [0, 0])
+    for (away, home), result in zip(schedule, results):
+        score = result.gamestate.score
+        away_name = 'Away' if away is None else away.name
+        home_name = 'Home' if home is None else home.name
+        if score.home > score.away:
+            home_wins += 1
+            standings[home_name][0] += 1
+            standings[away_name][1] += 1
+        elif score.away > score.home:
+            away_wins += 1
+            standings[away_name][0] += 1
+            standings[home_name][1] += 1
+    return SeasonResult(results, home_wins, away_wins, dict(standings), stats)
+
+
+if __name__ == '__main__':
+    season = simulate_season(40, seed=2017)
+    print('Home wins: {}  Away wins: {}'.format(
+        season.home_wins, season.away_wins)
+    )
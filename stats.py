@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import numpy as np
+
+from logic import AWAY_SHIFT, HOME_SHIFT, HALF_SHIFT
+from records import plate_appearance_types, record_names, record_types
+
+"""Box scores and season statistics.
+
+A StatsBook keeps batting, pitching and fielding counters for every
+player, keyed by (team name, player number), in array backed tables.
+It is an event sink (see BaseBallGame.set_event_sink): every record
+a game applies updates a few counters, in O(1), so season totals are
+kept as games are played, without replaying their logs.  Books are
+plain picklable objects and merge (book.merge(other)), so worker
+processes can each keep one.
+
+Which counters a record updates is read off its record type (see
+context.outcome_records): e.g. 'pitch.walk' adds a plate appearance
+and a walk to the batter, and a batter faced and a walk to the pitcher.
+Runs are the runs the gamestate counts: each record's run delta is
+credited to its actor, the runner who scored (of a move home or a
+score record), and charged to the pitcher, so the batting runs of a
+team add up to the runs its opponents' pitchers allowed, and to its
+score.
+"""
+
+batting_columns = ('pa', 'ab', 'h', 'doubles', 'triples', 'hr', 'bb', 'hbp',
+                   'so', 'r', 'sb', 'cs')
+pitching_columns = ('bf', 'outs', 'h', 'hr', 'bb', 'hbp', 'so', 'r',
+                    'wp', 'bk')
+fielding_columns = ('po', 'catches', 'drops', 'misses', 'throws',
+                    'bad_throws', 'e')
+
+class StatTable(object):
+    """Counters of one kind, one row per player.
+
+    Paramaters:
+    ==========
+    columns : tuple of counter names
+    capacity : int (default: 64), initial number of rows
+
+    Rows are added on first use of a key, and the array doubles when
+    it is full.
+    """
+    __slots__ = ('columns', 'index', 'keys', '_counts', '_n')
+
+    def __init__(self, columns, capacity=64):
+        self.columns = columns
+        self.index = {}
+        self.keys = []
+        self._counts = np.zeros((capacity, len(columns)), dtype=np.int64)
+        self._n = 0
+
+    def row(self, key):
+        """Returns the row of a key, adding it if needed."""
+        row = self.index.get(key)
+        if row is None:
+            row = self._n
+            if row == len(self._counts):
+                self._counts = np.concatenate(
+                    (self._counts, np.zeros_like(self._counts))
+                )
+            self.index[key] = row
+            self.keys.append(key)
+            self._n = row + 1
+        return row
+
+    def add(self, key, column, n=1):
+        """Adds n to the counter column (an int) of key."""
+        row = self.row(key)
+        self._counts[row, column] += n
+
+    @property
+    def counts(self):
+        """Returns the array of counters (rows in the order of keys)."""
+        return self._counts[:self._n]
+
+    def __getitem__(self, key):
+        """Returns the counters of a key, as a dict."""
+        row = self.index.get(key)
+        values = self.counts[row] if row is not None \
+            else np.zeros(len(self.columns), dtype=np.int64)
+        return dict(zip(self.columns, values.tolist()))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return self._n
+
+    def merge(self, other):
+        """Adds the counters of another table (with the same columns)."""
+        assert self.columns == other.columns
+        rows = [self.row(key) for key in other.keys]
+        np.add.at(self._counts, rows, other.counts)
+        return self
+
+"""Counter updates, by record type.
+
+Each rule is (table, role, column): the role says whose counter it is:
+the batter, the pitcher, the actor of the record as a runner (batting
+team) or as a fielder (fielding team), or the tagger of a tag.
+"""
+_rules = [() for _ in record_names]
+
+def _rule(prefix, *updates):
+    _rule_types(record_types(prefix), *updates)
+
+def _rule_types(rtypes, *updates):
+    for rtype in rtypes:
+        _rules[rtype] = _rules[rtype] + updates
+
+_H = (('batting', 'batter', 'h'), ('pitching', 'pitcher', 'h'))
+_AB = (('batting', 'batter', 'ab'),)
+_HIT = _AB + _H
+_HR = (('batting', 'batter', 'hr'), ('pitching', 'pitcher', 'hr'))
+
+"""A plate appearance (batter faced) for every record that ends one"""
+_rule_types(plate_appearance_types, ('batting', 'batter', 'pa'),
+            ('pitching', 'pitcher', 'bf'))
+_rule('pitch.walk', ('batting', 'batter', 'bb'),
+      ('pitching', 'pitcher', 'bb'))
+_rule('pitch.hbp', ('batting', 'batter', 'hbp'),
+      ('pitching', 'pitcher', 'hbp'))
+_rule('pitch.strikeout', *_AB, ('batting', 'batter', 'so'),
+      ('pitching', 'pitcher', 'so'))
+_rule('pitch.contact.hit', *_HIT)
+_rule('pitch.contact.hit.double', ('batting', 'batter', 'doubles'))
+_rule('pitch.contact.hit.triple', ('batting', 'batter', 'triples'))
+_rule('pitch.contact.hit.four', *_HR)
+_rule('pitch.contact.oop', *_HIT)
+_rule('pitch.contact.oop.gdb', ('batting', 'batter', 'doubles'))
+_rule('pitch.contact.oop.hr', *_HR)
+"""A bunt hit does not end the plate appearance: a hit, but no at bat"""
+_rule('pitch.contact.bunt', *_H)
+_rule('pitch.outs', *_AB, ('fielding', 'fielder', 'po'))
+_rule('pitch.wild', ('pitching', 'pitcher', 'wp'))
+_rule('pitch.balk', ('pitching', 'pitcher', 'bk'))
+_rule('game.error', ('fielding', 'fielder', 'e'))
+_rule('shift.out', ('pitching', 'pitcher', 'outs'))
+_rule('move.steal', ('batting', 'runner', 'sb'))
+_rule('move.caught', ('batting', 'runner', 'cs'))
+_rule('tag.out', ('fielding', 'tagger', 'po'))
+_rule('catch.yes', ('fielding', 'fielder', 'catches'))
+_rule('catch.drop', ('fielding', 'fielder', 'drops'))
+_rule('catch.miss', ('fielding', 'fielder', 'misses'))
+_rule('throw', ('fielding', 'fielder', 'throws'))
+for _name in ('dirt', 'low', 'high'):
+    _rule('throw.' + _name, ('fielding', 'fielder', 'bad_throws'))
+
+_table_columns = dict(batting=batting_columns, pitching=pitching_columns,
+                      fielding=fielding_columns)
+"""Rules with the column names replaced by their index"""
+_rules = [tuple((table, role, _table_columns[table].index(column))
+                for table, role, column in rules) for rules in _rules]
+
+_batting_r = batting_columns.index('r')
+_pitching_r = pitching_columns.index('r')
+
+def _runs(packed):
+    return ((packed >> AWAY_SHIFT) & 0xff) + ((packed >> HOME_SHIFT) & 0xff)
+
+class StatsBook(object):
+    """Batting, pitching and fielding counters, by (team, number).
+
+    A StatsBook is an event sink: pass it to simulate_game (event_sink)
+    or BaseBallGame.set_event_sink, for one game (a box score) or for
+    as many games as you like (season totals).
+    """
+    def __init__(self):
+        self.batting = StatTable(batting_columns)
+        self.pitching = StatTable(pitching_columns)
+        self.fielding = StatTable(fielding_columns)
+        self.games = 0
+        self._teams = {}
+
+    def start_game(self, game_id, away, home):
+        """Called by BaseBallGame.set_event_sink: the team names of a
+        game, to key its players by.
+        """
+        self._teams[game_id] = (away, home)
+        self.games += 1
+
+    def write(self, game, seq, time, code, actor, batter, pitcher, pre, post):
+        """Updates the counters from one record (the event sink call)."""
+        rtype = code >> 24
+        away, home = self._teams.get(game, ('Away', 'Home'))
+        if (pre >> HALF_SHIFT) & 1:
+            batting, fielding = home, away
+        else:
+            batting, fielding = away, home
+        for table, role, column in _rules[rtype]:
+            if role == 'batter':
+                key = (batting, batter)
+            elif role == 'pitcher':
+                key = (fielding, pitcher)
+            elif role == 'runner':
+                key = (batting, actor)
+            elif role == 'fielder':
+                key = (fielding, actor)
+            else:
+                key = (fielding, (code >> 16) & 0xff)
+            getattr(self, table).add(key, column)
+        runs = _runs(post) - _runs(pre)
+        if runs:
+            self.batting.add((batting, actor), _batting_r, runs)
+            self.pitching.add((fielding, pitcher), _pitching_r, runs)
+
+    def merge(self, other):
+        """Adds the counters of another StatsBook."""
+        self.batting.merge(other.batting)
+        self.pitching.merge(other.pitching)
+        self.fielding.merge(other.fielding)
+        self.games += other.games
+        return self
+
+    def players(self, team=None):
+        """Returns the (team, number) keys of the book, of one team or
+        of every team, in the order they were first seen.
+        """
+        keys = dict.fromkeys(self.batting.keys + self.pitching.keys
+                             + self.fielding.keys)
+        return [k for k in keys if team is None or k[0] == team]
+
+    def teams(self):
+        return list(dict.fromkeys(team for team, _ in self.players()))
+
+    def box_score(self):
+        """Returns the box score of the book, as text: batting and
+        pitching lines for every team.
+        """
+        bat_cols = ('pa', 'ab', 'h', 'hr', 'bb', 'so', 'r', 'sb')
+        pit_cols = ('bf', 'outs', 'h', 'bb', 'so', 'r')
+        lines = []
+        for team in self.teams():
+            lines.append(team)
+            lines.append('  {:>4}'.format('#') + ''.join(
+                '{:>5}'.format(c.upper()) for c in bat_cols))
+            for key in self.batting.keys:
+                if key[0] == team and self.batting[key]['pa']:
+                    stats = self.batting[key]
+                    lines.append('  {:>4}'.format(key[1]) + ''.join(
+                        '{:>5}'.format(stats[c]) for c in bat_cols))
+            lines.append('  {:>4}'.format('P') + ''.join(
+                '{:>5}'.format(c.upper()) for c in pit_cols))
+            for key in self.pitching.keys:
+                if key[0] == team:
+                    stats = self.pitching[key]
+                    lines.append('  {:>4}'.format(key[1]) + ''.join(
+                        '{:>5}'.format(stats[c]) for c in pit_cols))
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    from game import simulate_game
+    book = StatsBook()
+    simulate_game(seed=2017, event_sink=book)
+    print(book.box_score())
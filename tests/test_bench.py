@@ -0,0 +1,10 @@
+import os
+
+from bench import bench_import
+
+def test_game_import_is_lazy():
+    budget = os.environ.get('BAYESBALL_IMPORT_BUDGET_MS')
+    report = bench_import('game', float(budget) if budget else None)
+    assert report['lazy_imported'] == []
+    if budget:
+        assert report['within_budget']
@@ -0,0 +1,63 @@
+from game import simulate_game
+from logic import GameState, packed_field
+from records import record_tree
+
+class _Rows(object):
+    """Event sink keeping the rows it is sent."""
+    def __init__(self):
+        self.rows = []
+
+    def write(self, *row):
+        self.rows.append(row)
+
+def test_fast_mode_logs_plate_appearance_bases():
+    sink = _Rows()
+    simulate_game(seed=0, fast=True, event_sink=sink)
+    pa = record_tree['game']['pa']
+    rows = [row for row in sink.rows if row[3] >> 24 == pa]
+    assert rows
+    for game_id, seq, time, code, actor, batter, pitcher, pre, post in rows:
+        assert packed_field(post, 'bases') == (code >> 16) & 0xff
+
+def test_fast_mode_log_matches_gamestate():
+    sink = _Rows()
+    result = simulate_game(seed=1, fast=True, event_sink=sink)
+    post = sink.rows[-1][-1]
+    state = GameState.from_packed(post)
+    assert state.score == result.gamestate.score
+
+def test_event_keeps_the_locations_it_saw():
+    from actions import MoveEvent
+    from game import BaseBallGame, PlayEnvironment
+    game = BaseBallGame(None, None, rng=2)
+    game.upkeep(1)
+    game.change_lineup
+    env = PlayEnvironment(game.locations, game.batter, game.pitcher)
+    event = MoveEvent(game.gamestate, env, game.batter, 0, 1, rng=game.rng)
+    before = game.locations.snapshot()
+    pitcher, catcher = game.locations.mound, game.locations.home
+    game.swap_players(pitcher, catcher)
+    game.locations.firstbase = game.batter
+    assert game.locations.mound is catcher
+    ref = event.ref_class
+    seen = ref.environment.capture(ref.version).locations
+    assert seen == before
+    assert seen.mound is pitcher and seen.firstbase is None
+    assert env.capture().locations.mound is catcher
+
+def test_location_history_belongs_to_the_plate_appearance():
+    from actions import MoveEvent
+    from game import BaseBallGame, PlayEnvironment
+    game = BaseBallGame(None, None, rng=3)
+    game.upkeep(1)
+    game.change_lineup
+    first = PlayEnvironment(game.locations, game.batter, game.pitcher)
+    event = MoveEvent(game.gamestate, first, game.batter, 0, 1, rng=game.rng)
+    before = game.locations.snapshot()
+    second = PlayEnvironment(game.locations, game.batter, game.pitcher)
+    later = MoveEvent(game.gamestate, second, game.batter, 0, 1, rng=game.rng)
+    game.locations.firstbase = game.batter
+    game.locations.secondbase = game.batter
+    assert list(first.history) == list(second.history) == [event.ref_class.version]
+    assert first.capture(event.ref_class.version).locations == before
+    assert second.capture(later.ref_class.version).locations == before
@@ -0,0 +1,18 @@
+import pytest
+
+from logic import pack_fields, packed_field, packed_fields, packed_layout
+
+@pytest.mark.parametrize('name', packed_fields)
+def test_pack_fields_rejects_overflow(name):
+    bits = packed_layout[name][1]
+    with pytest.raises(ValueError):
+        pack_fields(**{name: 1 << bits})
+    with pytest.raises(ValueError):
+        pack_fields(**{name: -1})
+
+def test_pack_fields_keeps_fields_apart():
+    fields = dict((name, (1 << packed_layout[name][1]) - 1)
+                  for name in packed_fields)
+    packed = pack_fields(**fields)
+    for name, value in fields.items():
+        assert packed_field(packed, name) == value
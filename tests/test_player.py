@@ -0,0 +1,11 @@
+from player import BaseBallPlayer, default_table, pos_from_str
+
+def test_players_without_a_table_share_one():
+    first = BaseBallPlayer(1, 'P', 'Ballard', 50, 20, 100, rng=1)
+    second = BaseBallPlayer(2, 'C', 'Ballard', 50, 20, 100, rng=2)
+    assert first.table is second.table is default_table
+    assert second.row == first.row + 1
+    assert (first.num, second.pos) == (1, pos_from_str('C'))
+    assert not (first.swung or first.leadoff or first.stealing
+                or first.pick_off)
+    assert first.pickoff_location is None
@@ -0,0 +1,10 @@
+from records import encode, parse_record, record_tree
+
+def test_triple_play_keeps_every_fielder():
+    code = encode(record_tree['game']['tp'], 3, 6, 5)
+    assert str(code) == 'TP:3-6-5'
+    assert parse_record('TP:3-6-5') == code
+
+def test_two_operand_records_keep_the_actor_free():
+    code = parse_record('DP:4-3')
+    assert (code.a, code.b, code.actor) == (4, 3, 0)
@@ -0,0 +1,34 @@
+import pytest
+
+from eventlog import EventSinks
+from game import simulate_game
+from records import plate_appearance_types, record_types
+from stats import StatsBook
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_runs_reconcile(fast):
+    book = StatsBook()
+    result = simulate_game(seed=2017, fast=fast, event_sink=book)
+    score = result.gamestate.score
+    for team, opponent, runs in (('Bellevue', 'Ballard', score.away),
+                                 ('Ballard', 'Bellevue', score.home)):
+        batting = sum(book.batting[key]['r'] for key in book.batting.keys
+                      if key[0] == team)
+        allowed = sum(book.pitching[key]['r'] for key in book.pitching.keys
+                      if key[0] == opponent)
+        assert batting == allowed == runs
+
+def test_plate_appearances_match_records():
+    rows = []
+    class Rows(object):
+        def write(self, *row):
+            rows.append(row)
+    book = StatsBook()
+    sinks = EventSinks(book, Rows())
+    for seed in range(3):
+        simulate_game(seed=seed, event_sink=sinks, game_id=seed)
+    ends = sum((row[3] >> 24) in plate_appearance_types for row in rows)
+    bunts = record_types('pitch.contact.bunt')
+    assert not bunts & plate_appearance_types
+    assert sum(book.batting[key]['pa'] for key in book.batting.keys) == ends
+    assert sum(book.pitching[key]['bf'] for key in book.pitching.keys) == ends
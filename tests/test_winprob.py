@@ -0,0 +1,6 @@
+from winprob import build_win_table, validate
+
+def test_table_matches_batched_games():
+    table = build_win_table(max_diff=15)
+    check = validate(games=20000, seed=0, table=table)
+    assert abs(check['z']) < 4
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import os
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+
+from game import BaseBallGame
+from helpers import spawn_seeds
+
+WhatIfResult = namedtuple('WhatIfResult', [
+    'n', 'home_win', 'away_win', 'undecided', 'run_diffs', 'final_scores'
+])
+
+"""Fork state of a worker process: (away, home, snapshot, intervention)"""
+_fork = None
+
+def _init_fork(away_team, home_team, snapshot, intervention):
+    global _fork
+    _fork = (away_team, home_team, snapshot, intervention)
+
+def _continue(seed):
+    """Worker function: plays one continuation from the fork state."""
+    away_team, home_team, snapshot, intervention = _fork
+    game = BaseBallGame.from_snapshot(away_team, home_team, snapshot, rng=seed)
+    if intervention is not None:
+        intervention(game)
+    result = game.finish()
+    score = game.gamestate.score
+    return result, score.away, score.home
+
+def what_if(game, n, intervention=None, seed=None,
+            processes=None, chunksize=None):
+    """Plays n continuations of a game from its current gamestate,
+    and returns the distribution of their outcomes.
+
+    Paramaters:
+    ==========
+    game : BaseBallGame (between plays)
+    n : int
+    intervention : callable (default: None)
+
+    - called with each continuation, before it is played on, e.g.
+      intentional_walk. With processes, it has to be picklable
+      (i.e. a module level function).
+
+    seed : int (default: None)
+
+    - continuation i draws from the i-th SeedSequence spawned from seed.
+
+    processes : int (default: None, i.e. one per CPU)
+    chunksize : int (default: None)
+
+    The game itself is not changed: continuations are played on
+    copies of the teams, restored from game.snapshot().
+
+    Returns a WhatIfResult, with home_win, away_win and undecided as
+    fractions of n, and Counters of the final run differentials
+    (home - away) and final (away, home) scores.
+    """
+    snapshot = game.snapshot()
+    fork = (game.away, game.home, snapshot, intervention)
+    seeds = spawn_seeds(seed, n)
+    processes = os.cpu_count() if processes is None else processes
+    if processes <= 1 or n <= 1:
+        _init_fork(*deepcopy(fork))
+        results = list(map(_continue, seeds))
+    else:
+        if chunksize is None:
+            chunksize = max(1, n // (4 * processes))
+        with ProcessPoolExecutor(max_workers=processes,
+                                 initializer=_init_fork,
+                                 initargs=fork) as pool:
+            results = list(pool.map(_continue, seeds, chunksize=chunksize))
+
+    outcomes = Counter(r[0] for r in results)
+    return WhatIfResult(
+        n=n,
+        home_win=outcomes[1] / n,
+        away_win=outcomes[0] / n,
+        undecided=outcomes[-1] / n,
+        run_diffs=Counter(home - away for _, away, home in results),
+        final_scores=Counter((away, home) for _, away, home in results)
+    )
+
+"""Interventions"""
+def intentional_walk(game):
+    """Intentionally walks the batter: forced runners advance, and
+    the batter goes to first base.
+    """
+    game.change_lineup
+    locs = game.locations
+    if locs.firstbase:
+        if locs.secondbase:
+            if locs.thirdbase:
+                game.action_move(locs.thirdbase, 3, 4)
+            game.action_move(game.locations.secondbase, 2, 3)
+        game.action_move(game.locations.firstbase, 1, 2)
+    game.action_move(game.batter, 0, 1)
+    game.action_shift('iwalk')
+    game._batter_done = True
+    game.apply_records()
+
+def steal(game):
+    """The lead runner with an open base ahead steals it now, through
+    the steal sequence of the game engine: on a steal of home the
+    catcher tags the runner, otherwise the catcher throws to the
+    fielder at the base, who tags the runner after a good throw.  The
+    runner moves on if safe, and is caught stealing if out.  Does
+    nothing if no runner can steal.
+    """
+    game.change_lineup
+    locs = game.locations
+    catcher = locs.home
+    for n, base, ahead, target in ((3, 'thirdbase', None, None),
+                                   (2, 'secondbase', 'thirdbase', 'third'),
+                                   (1, 'firstbase', 'secondbase', 'second')):
+        runner = getattr(locs, base)
+        if runner and not (ahead and getattr(locs, ahead)):
+            break
+    else:
+        return
+    if target is None:
+        tag = game.action_tag(catcher, runner)
+    else:
+        fielder = getattr(locs, target)
+        throw = game.action_throw(catcher, fielder)
+        tag = game.action_tag(fielder, runner) \
+            if throw.result == 'good' else None
+    if tag is not None and tag.result == 'out':
+        game.action_move(runner, n, n+1, option='caught')
+    else:
+        game.action_move(runner, n, n+1, option='steal')
+    game.apply_records()
+
+
+if __name__ == '__main__':
+    from itertools import count
+    game = BaseBallGame(None, None, rng=2017)
+    for I in count(1, .5):
+        game.upkeep(I)
+        if I == 7:
+            break
+        while game.gamestate.count.outs < 3:
+            game.play
+    print(game.gamestate)
+    for name, intervention in [('play on', None),
+                               ('intentional walk', intentional_walk),
+                               ('steal', steal)]:
+        result = what_if(game, 100, intervention, seed=1)
+        print('{}: home wins {:.3f}'.format(name, result.home_win))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Written by:  Christopher F. French
+        email:  cffrench.writes@gmail.com
+         date:  2017
+      version:  0.1.0
+
+This is a pre-alpha, broken, version of BayesBall.
+
+--------------------------------------------------------------------------------
+This file is part of BayesBall.
+
+BayesBall is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+BayesBall is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with BayesBall.  If not, see <http://www.gnu.org/licenses/>.
+--------------------------------------------------------------------------------
+"""
+import os
+import numpy as np
+
+from logic import bases_mask, inning_order
+from markov import half_inning_end_distribution, state_index
+
+"""Win expectancy tables.
+
+A win table holds the chance that the home team wins, indexed by
+
+    table[inning - 1, half, outs, bases, diff + max_diff]
+
+where half is 0 (top) or 1 (bottom), bases is the occupied base mask
+(first=1, second=2, third=4) and diff is home minus away runs.  Each
+entry is the value with the count at 0-0.
+
+The table is computed by dynamic programming over the half-inning
+distributions of markov.half_inning_end_distribution, backwards from
+the end of the game, with the same end of game rules as
+BaseBallGame.win.  By default they count runs and outs as BaseBallGame
+does (see markov.pitch_transitions, engine=True), and the runners left
+on base at the end of a half inning start the next one, as in
+BaseBallGame and batch.py: the start of a half inning is its 0 outs
+row, with the carried runners.  From the 10th inning on every inning
+is the same, so the last inning of the table is the fixed point of
+extra innings, and later innings use it.
+"""
+
+"""Tables are stored as float32, to keep the files small."""
+table_dtype = np.float32
+
+"""Tables built before they counted as BaseBallGame does were saved to
+winprob.npy, so the default table has a file of its own."""
+default_table_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'winprob_engine.npy'
+)
+
+"""Last inning with its own end of game rules (see BaseBallGame.win)"""
+LAST_RULE_INNING = 10
+
+def game_over(inning, half, diff):
+    """Returns 1 (home won), 0 (away won) or None (play on), at the
+    start of a half inning, as in BaseBallGame.win.
+    """
+    I = inning + .5 * half
+    if I >= 9 and diff > 0:
+        return 1
+    if I >= 9.5 and diff < 0:
+        return 0
+    return None
+
+def _play_half(runs, values, half, max_diff):
+    """Returns the value of every (outs, bases, diff) state of a half
+    inning, given the values at the start of the next half inning.
+
+    runs : array (3, 8, 8, R+1), distributions of the runs and the
+        runners left on base at the end of the half
+    values : array (8, 2*max_diff+1), by the runners carried over
+    """
+    diffs = np.arange(-max_diff, max_diff + 1)
+    scored = np.arange(runs.shape[-1])
+    sign = 1 if half else -1
+    after = np.clip(diffs[:, None] + sign * scored[None, :], -max_diff, max_diff)
+    """(8, D, R+1) @ (3, 8, 8, R+1) -> (3, 8, D)"""
+    return np.einsum('mdr,obmr->obd', values[:, after + max_diff], runs)
+
+def _start_values(table_half, inning, half, max_diff):
+    """Values at the start of a half inning (before the first pitch),
+    by the runners carried over: array (8, 2*max_diff+1).
+    """
+    values = table_half[0].copy()
+    for n, diff in enumerate(range(-max_diff, max_diff + 1)):
+        over = game_over(inning, half, diff)
+        if over is not None:
+            values[:, n] = over
+    return values
+
+def build_win_table(model=None, engine=True, innings=LAST_RULE_INNING,
+                    max_diff=30, tol=1e-12):
+    """Computes a win table.
+
+    Paramaters:
+    ==========
+    model : markov.ChainModel (default: markov.event_model())
+    engine : Boolean (default: True)
+
+    - if True, runs and outs are counted as BaseBallGame counts them,
+      and the runners left on base start the next half inning (see
+      markov.half_inning_end_distribution).  With engine=False, the
+      table follows the exact chain, and every half inning starts
+      with the bases empty.
+
+    innings : int (default: 10, at least LAST_RULE_INNING)
+    max_diff : int (default: 30)
+
+    - run differentials beyond max_diff are clamped to max_diff.
+
+    tol : float
+
+    - tolerance of the extra innings fixed point iteration.
+
+    Returns an array (innings, 2, 3, 8, 2*max_diff+1)
+    """
+    assert innings >= LAST_RULE_INNING
+    dist = half_inning_end_distribution(model, engine, max_runs=2 * max_diff)
+    runs = np.array([[dist[state_index(0, 0, outs, bases)]
+                      for bases in range(8)] for outs in range(3)])
+    n_diff = 2 * max_diff + 1
+    table = np.empty((innings, 2, 3, 8, n_diff))
+
+    """Extra innings: iterate to the fixed point"""
+    last = innings - 1
+    top_start = np.full((8, n_diff), .5)
+    while True:
+        table[last, 1] = _play_half(runs, top_start, 1, max_diff)
+        bottom_start = _start_values(table[last, 1], innings, 1, max_diff)
+        table[last, 0] = _play_half(runs, bottom_start, 0, max_diff)
+        new_start = _start_values(table[last, 0], innings, 0, max_diff)
+        converged = np.abs(new_start - top_start).max() < tol
+        top_start = new_start
+        if converged:
+            break
+
+    next_start = top_start
+    for n in range(last - 1, -1, -1):
+        for half in (1, 0):
+            table[n, half] = _play_half(runs, next_start, half, max_diff)
+            next_start = _start_values(table[n, half], n + 1, half, max_diff)
+    return table.astype(table_dtype)
+
+def save_win_table(table, path=default_table_path):
+    """Writes a win table to a .npy file."""
+    np.save(path, np.asarray(table, dtype=table_dtype))
+
+def load_win_table(path=default_table_path):
+    """Memory maps a win table from a .npy file."""
+    return np.load(path, mmap_mode='r')
+
+_default_table = None
+
+def default_win_table():
+    """Returns the default win table, memory mapped from
+    default_table_path.  The table is built (and saved) on first use.
+    """
+    global _default_table
+    if _default_table is None:
+        if not os.path.exists(default_table_path):
+            table = build_win_table()
+            try:
+                save_win_table(table, default_table_path)
+            except OSError:
+                _default_table = table
+                return table
+        """A plain ndarray view indexes faster than the memmap"""
+        _default_table = load_win_table(default_table_path).view(np.ndarray)
+    return _default_table
+
+def win_probability(gamestate, table=None, bases=None):
+    """Returns the chance that the home team wins, from a GameState.
+
+    Paramaters:
+    ==========
+    gamestate : logic.GameState
+    table : array (default: default_win_table())
+    bases : int (default: None, i.e. the bases of the gamestate)
+
+    - the occupied base mask of the runners on the field.  After the
+      third out, they are the runners carried into the next half
+      inning.
+    """
+    if table is None:
+        table = _default_table
+        if table is None:
+            table = default_win_table()
+    innings, _, _, _, n_diff = table.shape
+    max_diff = n_diff // 2
+    inning = gamestate.inning
+    half = inning_order.index(inning.order)
+    n = max(int(inning.inning), 1)
+    diff = gamestate.score.home - gamestate.score.away
+    outs = gamestate.count.outs
+    bases = bases_mask(gamestate.bases) if bases is None else bases
+    if outs >= 3:
+        """Between half innings: the runners stay on base"""
+        n, half = (n + 1, 0) if half else (n, 1)
+        over = game_over(n, half, diff)
+        if over is not None:
+            return float(over)
+        outs = 0
+    diff = min(max(diff, -max_diff), max_diff)
+    return float(table[min(n, innings) - 1, half, outs, bases, diff + max_diff])
+
+def validate(games=20000, seed=0, table=None):
+    """Checks a win table against batched games (see batch.py), which
+    count runs and outs as BaseBallGame does, like the default table.
+
+    Paramaters:
+    ==========
+    games : int (default: 20000), batched games played
+    seed : int (default: 0)
+    table : array (default: default_win_table())
+
+    Returns a dict with the home win fraction of the decided batched
+    games, the table's value at the first pitch, and the z score of
+    their difference (|z| < 3 is a match).
+    """
+    from batch import simulate_games
+    table = default_win_table() if table is None else table
+    expected = float(table[0, 0, 0, 0, table.shape[-1] // 2])
+    result = simulate_games(games, seed=seed)
+    decided = result.decided.sum()
+    home_win = float((result.home > result.away).sum() / decided)
+    se = np.sqrt(expected * (1 - expected) / decided)
+    return dict(home_win=home_win, expected=expected,
+                z=float((home_win - expected) / se))
+
+
+if __name__ == '__main__':
+    table = build_win_table()
+    save_win_table(table)
+    print('Home win probability at the first pitch: {:.3f}'.format(
+        table[0, 0, 0, 0, table.shape[-1] // 2])
+    )
+    print('Against batched games: {}'.format(validate(table=table)))